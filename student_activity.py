@@ -0,0 +1,198 @@
+# ------------------------------------------------------------
+# Login Activity Log for the Student Registration and Login System
+# ------------------------------------------------------------
+# Student records only keep login_count and the last_login time, so
+# every login is also appended to an event log kept next to the data
+# file (students.json.activity/):
+#   - one segment file per (local) day, logins-YYYY-MM-DD.bin
+#   - fixed-width 16-byte events: epoch seconds (int64) and an 8-byte
+#     BLAKE2b digest of the student ID, so any ID fits and several
+#     processes can append without coordinating
+# Reports never scan the events. Rollups (logins per hour, distinct
+# students per day, last login per student) are folded in from the
+# events appended since the last checkpoint and saved with the number
+# of bytes of each segment they cover (rollups.json), so bringing them
+# up to date only reads what is new. Nothing is read until the first
+# report or checkpoint: recording logins does not need the rollups.
+# ------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import struct
+import time
+
+# One login: epoch seconds and the student's key (see student_key)
+EVENT = struct.Struct("<q8s")
+
+SEGMENT_PREFIX = "logins-"
+SEGMENT_SUFFIX = ".bin"
+ROLLUP_FILE = "rollups.json"
+ROLLUP_VERSION = 1
+
+# Save the rollups after this many logins (and on close)
+CHECKPOINT_EVERY = 1000
+
+
+def student_key(student_id):
+    """
+    Return the 8-byte key that stands for a student in the event log.
+    """
+    return hashlib.blake2b(student_id.encode(), digest_size=8).digest()
+
+
+def local_day(when):
+    return time.strftime("%Y-%m-%d", time.localtime(when))
+
+
+def segment_name(when):
+    return f"{SEGMENT_PREFIX}{local_day(when)}{SEGMENT_SUFFIX}"
+
+
+class ActivityLog:
+    """
+    Append-only login event log with incrementally maintained rollups.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.covered = {}       # segment file name -> bytes folded into the rollups
+        self.hourly = {}        # epoch hour (seconds // 3600) -> logins
+        self.daily_active = {}  # "YYYY-MM-DD" -> students who logged in that day
+        self.last_seen = {}     # student key (hex) -> epoch seconds of last login
+        self._segment = None    # name of the segment self._fd appends to
+        self._fd = None
+        self._pending = 0       # logins recorded since the last checkpoint
+        self._loaded = False    # rollups.json is only read by the first catch_up()
+
+    def _load_rollups(self):
+        self._loaded = True
+        try:
+            with open(os.path.join(self.directory, ROLLUP_FILE)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            # Missing or damaged: rebuilt from the segments on first use
+            return
+        if not isinstance(data, dict) or data.get("version") != ROLLUP_VERSION:
+            return
+        self.covered = data["covered"]
+        self.hourly = {int(hour): count for hour, count in data["hourly"].items()}
+        self.daily_active = data["daily_active"]
+        self.last_seen = data["last_seen"]
+
+    def record(self, student_id, when=None):
+        """
+        Append one login (at epoch seconds when, default now).
+        """
+        when = int(time.time() if when is None else when)
+        name = segment_name(when)
+        if name != self._segment:
+            # First login of the day (or of this process): new segment
+            if self._fd is not None:
+                os.close(self._fd)
+            os.makedirs(self.directory, exist_ok=True)
+            self._fd = os.open(os.path.join(self.directory, name),
+                               os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._segment = name
+        # O_APPEND keeps each small write whole even with other writers
+        os.write(self._fd, EVENT.pack(when, student_key(student_id)))
+        self._pending += 1
+        if self._pending >= CHECKPOINT_EVERY:
+            self.checkpoint()
+
+    def catch_up(self):
+        """
+        Fold events appended since the rollups were last brought up to
+        date (by this or any other process) into them.
+        """
+        if not self._loaded:
+            self._load_rollups()
+        try:
+            names = sorted(name for name in os.listdir(self.directory)
+                           if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX))
+        except FileNotFoundError:
+            return
+        for name in names:
+            path = os.path.join(self.directory, name)
+            size = os.path.getsize(path)
+            size -= size % EVENT.size  # ignore an event still being written
+            start = self.covered.get(name, 0)
+            if size <= start:
+                continue
+            with open(path, 'rb') as f:
+                f.seek(start)
+                data = f.read(size - start)
+            for when, key in EVENT.iter_unpack(data):
+                self._fold(when, key.hex())
+            self.covered[name] = size
+
+    def _fold(self, when, key):
+        hour = when // 3600
+        self.hourly[hour] = self.hourly.get(hour, 0) + 1
+        previous = self.last_seen.get(key)
+        if previous is None or previous < when:
+            day = local_day(when)
+            if previous is None or local_day(previous) != day:
+                self.daily_active[day] = self.daily_active.get(day, 0) + 1
+            self.last_seen[key] = when
+
+    def checkpoint(self):
+        """
+        Bring the rollups up to date and save them (atomically).
+        """
+        self.catch_up()
+        self._pending = 0
+        if not self.covered:
+            return
+        path = os.path.join(self.directory, ROLLUP_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                "version": ROLLUP_VERSION,
+                "covered": self.covered,
+                "hourly": self.hourly,
+                "daily_active": self.daily_active,
+                "last_seen": self.last_seen,
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def close(self):
+        if self._pending:
+            self.checkpoint()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = self._segment = None
+
+    # --- Reports -----------------------------------------------
+    # Call catch_up() first to include other processes' latest logins.
+
+    def logins(self, start, end, by="day"):
+        """
+        Return [(period, logins, active)] for every hour or day between
+        epoch seconds start and end, oldest first. period is
+        "YYYY-MM-DD" or "YYYY-MM-DD HH:00" (local time); active is the
+        number of distinct students that day (None per hour).
+        """
+        if by not in ("day", "hour"):
+            raise ValueError(f"Unknown period '{by}' (use day or hour)")
+        periods = {}
+        for hour in range(int(start) // 3600, int(end) // 3600 + 1):
+            if by == "hour":
+                label = time.strftime("%Y-%m-%d %H:00", time.localtime(hour * 3600))
+            else:
+                label = local_day(hour * 3600)
+            periods[label] = periods.get(label, 0) + self.hourly.get(hour, 0)
+        return [(label, count, self.daily_active.get(label, 0) if by == "day" else None)
+                for label, count in periods.items()]
+
+    def last_login(self, student_id):
+        """
+        Return the epoch seconds of a student's last logged login, or None.
+        """
+        return self.last_seen.get(student_key(student_id).hex())
+
+    def active_count(self, since):
+        """
+        Number of students with a login at or after epoch seconds since.
+        """
+        return sum(1 for when in self.last_seen.values() if when >= since)
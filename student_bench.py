@@ -0,0 +1,446 @@
+# ------------------------------------------------------------
+# Benchmarks for the Student Registration and Login System
+# ------------------------------------------------------------
+# Usage:
+#   python student_bench.py memory [--students N] [--json FILE]
+#       Compare the memory used by a roster held as dicts with the
+#       same roster held as compact StudentRecord objects.
+#   python student_bench.py kdf [--kdf scrypt|pbkdf2] [--costs N ...]
+#                               [--logins N] [--workers N]
+#       Logins/sec for each password hashing cost, with the checks
+#       spread over a process pool like the service does.
+#   python student_bench.py ops [--sizes N ...] [--engine E] [--samples N]
+#                               [--fast-kdf] [--json FILE] [--compare OLD.json]
+#       Time load, save, register, login, search, view and delete on
+#       synthetic rosters (default 1k, 100k and 1M students), each size
+#       in a fresh process. Reports ops/sec, latency percentiles and
+#       peak memory; --json keeps the results and --compare checks them
+#       against an earlier run (exit status 1 on a regression).
+#   python student_bench.py snapshot [--students N] [--json FILE]
+#       Save and load time and file size of a roster as a
+#       pretty-printed JSON data file and as a binary snapshot.
+# ------------------------------------------------------------
+
+import argparse
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import student_passwords
+from student_passwords import HAVE_SCRYPT, hash_password, verify_password
+from student_records import StudentRecord, TIME_FORMAT
+
+# resource (peak RSS) only exists on POSIX
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Roster sizes measured by the ops benchmark when none are given
+OPS_SIZES = (1000, 100000, 1000000)
+
+# Operations timed by the ops benchmark, in the order they run
+OPERATIONS = ("load", "save", "lookup_index", "register", "login", "search_index", "search",
+              "view_order", "view", "delete")
+
+
+def make_record(rng, index):
+    """
+    Build one synthetic student record in the students.json schema.
+    """
+    first = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))).title()
+    last = "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 11))).title()
+    registered = datetime(2024, 1, 1) + timedelta(seconds=rng.randrange(60 * 60 * 24 * 700))
+    logins = rng.randrange(200)
+    last_login = registered + timedelta(seconds=rng.randrange(60 * 60 * 24 * 30)) if logins else None
+    return {
+        "name": f"{first} {last}",
+        "email": f"{first.lower()}.{last.lower()}{index}@example.com",
+        "password_hash": hashlib.sha256(f"password{index}".encode()).hexdigest(),
+        "registered_on": registered.strftime(TIME_FORMAT),
+        "login_count": logins,
+        "last_login": last_login.strftime(TIME_FORMAT) if last_login else None
+    }
+
+
+def make_roster(count, seed=0):
+    """
+    Yield (student_id, record) pairs for a synthetic roster.
+    The same count and seed always give the same roster.
+    """
+    rng = random.Random(seed)
+    for index in range(count):
+        yield f"S{index:07d}", make_record(rng, index)
+
+
+def traced_size(build):
+    """
+    Return the number of bytes still allocated by build() once it has
+    returned (its result is kept alive while measuring).
+    """
+    tracemalloc.start()
+    try:
+        result = build()
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_memory(count):
+    """
+    Measure the dict layout against the StudentRecord layout.
+    Returns a dictionary of results.
+    """
+    dict_bytes = traced_size(lambda: dict(make_roster(count)))
+    compact_bytes = traced_size(lambda: {student_id: StudentRecord.from_mapping(record)
+                                         for student_id, record in make_roster(count)})
+    return {
+        "students": count,
+        "dict_bytes": dict_bytes,
+        "compact_bytes": compact_bytes,
+        "dict_bytes_per_student": round(dict_bytes / count, 1),
+        "compact_bytes_per_student": round(compact_bytes / count, 1),
+        "saving": round(1 - compact_bytes / dict_bytes, 3)
+    }
+
+
+def bench_snapshot(count):
+    """
+    Time writing and reading a roster in each snapshot format (reading
+    both as dicts and as compact records) and compare the file sizes.
+    Returns a dictionary of results.
+    """
+    from student_storage import SNAPSHOT_FORMATS, read_snapshot, write_snapshot
+
+    records = dict(make_roster(count))
+    results = {"students": count}
+    directory = tempfile.mkdtemp()
+    try:
+        for snapshot_format in SNAPSHOT_FORMATS:
+            path = os.path.join(directory, f"students.{snapshot_format}")
+            start = time.perf_counter()
+            size = write_snapshot(path, records, snapshot_format=snapshot_format)
+            results[f"{snapshot_format}_save_seconds"] = round(time.perf_counter() - start, 3)
+            results[f"{snapshot_format}_bytes"] = size
+            results[f"{snapshot_format}_bytes_per_student"] = round(size / count, 1)
+            for compact in (False, True):
+                start = time.perf_counter()
+                loaded = read_snapshot(path, compact)
+                elapsed = time.perf_counter() - start
+                if len(loaded) != count or dict(loaded["S0000000"]) != records["S0000000"]:
+                    raise RuntimeError(f"{snapshot_format} snapshot did not read back")
+                del loaded
+                layout = "compact" if compact else "dict"
+                results[f"{snapshot_format}_load_{layout}_seconds"] = round(elapsed, 3)
+    finally:
+        shutil.rmtree(directory)
+    results["binary_size_ratio"] = round(results["binary_bytes"] / results["json_bytes"], 3)
+    return results
+
+
+# Costs compared by the kdf benchmark when none are given
+KDF_COSTS = {
+    "scrypt": (2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15),
+    "pbkdf2": (100000, 300000, 600000, 1000000),
+}
+
+
+def bench_kdf(kdfs, costs, logins, workers):
+    """
+    Time logins (password checks) at each cost setting.
+    Returns a dictionary of results.
+    """
+    password = "benchmark-password"
+    results = {"workers": workers, "logins": logins}
+    with ProcessPoolExecutor(workers) as pool:
+        # Start every worker before timing anything
+        list(pool.map(abs, range(workers)))
+        for kdf in kdfs:
+            for cost in costs or KDF_COSTS[kdf]:
+                password_hash = hash_password(password, kdf, cost)
+                start = time.perf_counter()
+                verify_password(password, password_hash)
+                single = time.perf_counter() - start
+
+                start = time.perf_counter()
+                outcomes = list(pool.map(verify_password, [password] * logins, [password_hash] * logins))
+                elapsed = time.perf_counter() - start
+                if not all(ok for ok, _ in outcomes):
+                    raise RuntimeError(f"{kdf} cost {cost}: password check failed")
+                results[f"{kdf}_{cost}_ms_per_login"] = round(single * 1000, 2)
+                results[f"{kdf}_{cost}_logins_per_second"] = round(logins / elapsed, 1)
+    return results
+
+
+def summarize(latencies):
+    """
+    Throughput and latency percentiles for a list of per-call seconds.
+    """
+    total = sum(latencies)
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0]
+    return {
+        "calls": len(latencies),
+        "seconds": round(total, 6),
+        "ops_per_second": round(len(latencies) / total, 1) if total else None,
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def timed(function, arguments):
+    """
+    Call function once per item of arguments (a tuple of positional
+    arguments each). Returns the list of per-call seconds.
+    """
+    latencies = []
+    for args in arguments:
+        start = time.perf_counter()
+        function(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def write_roster(path, count, seed):
+    """
+    Write a synthetic roster to path in the students.json layout.
+    """
+    from student_storage import write_snapshot
+    write_snapshot(path, dict(make_roster(count, seed)))
+
+
+def bench_size(path, count, engine, samples, seed, fast_kdf):
+    """
+    Time every operation of OPERATIONS against a copy of the roster at
+    path (which holds count students). Meant to run in its own process,
+    so that the peak memory reported belongs to this roster alone.
+    Returns a dictionary: operation -> summarize() results, plus memory.
+    """
+    import student_system
+    from student_listing import format_page
+
+    student_system.STORAGE_ENGINE = engine
+    if fast_kdf:
+        # Measure the system rather than the password hashing
+        student_passwords.SCRYPT_N = 2 ** 10
+        student_passwords.PBKDF2_ITERATIONS = 1000
+    rng = random.Random(seed)
+    existing = [f"S{index:07d}" for index in rng.sample(range(count), min(samples, count))]
+    results = {}
+
+    start = time.perf_counter()
+    system = student_system.StudentSystem(path)
+    results["load"] = summarize([time.perf_counter() - start])
+    try:
+        results["save"] = summarize(timed(system.save_data, [()]))
+
+        results["lookup_index"] = summarize(timed(system.lookup_index, [()]))
+        new_ids = [f"B{index:07d}" for index in range(samples)]
+        results["register"] = summarize(timed(system.register_student, [
+            (f"Bench Student {index}", student_id, f"bench{index}@example.com", "bench-password")
+            for index, student_id in enumerate(new_ids)]))
+
+        # Synthetic students have legacy hashes of "password<index>", so
+        # the first login of each also measures the upgrade to the KDF
+        results["login"] = summarize(timed(system.authenticate, [
+            (student_id, f"password{int(student_id[1:])}") for student_id in existing]))
+
+        names = [student.name.lower() for student in system.get_many(existing).values()]
+        results["search_index"] = summarize(timed(system.search_index, [()]))
+        results["search"] = summarize(timed(system.find_students, [
+            (name[:rng.randint(2, 6)], student_system.SEARCH_PAGE_SIZE) for name in names]))
+
+        def view_page(offset):
+            page = system.list_students("name", limit=student_system.LIST_PAGE_SIZE, offset=offset)
+            io.StringIO().write(format_page(page.students))
+
+        results["view_order"] = summarize(timed(system.ordering, [("name",)]))
+        results["view"] = summarize(timed(view_page, [(rng.randrange(count),) for _ in range(samples)]))
+
+        results["delete"] = summarize(timed(system.remove_student, [(student_id,) for student_id in existing]))
+    finally:
+        system.close()
+
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        results["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return results
+
+
+def in_fresh_process(function, *args):
+    """
+    Run function(*args) in a newly started process and return its result.
+    """
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(1, mp_context=context) as pool:
+        return pool.submit(function, *args).result()
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_ops(sizes, engine, samples, seed=0, fast_kdf=False):
+    """
+    Run bench_size() for each roster size on a throwaway copy of a
+    generated students.json.
+    Returns {"meta": ..., "sizes": {size: results}}.
+    """
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "engine": engine,
+            "samples": samples,
+            "seed": seed,
+            "fast_kdf": fast_kdf,
+            "kdf": student_passwords.PASSWORD_KDF,
+        },
+        "sizes": {},
+    }
+    directory = tempfile.mkdtemp()
+    try:
+        for count in sizes:
+            path = os.path.join(directory, f"students-{count}.json")
+            in_fresh_process(write_roster, path, count, seed)
+            report["sizes"][str(count)] = in_fresh_process(bench_size, path, count, engine,
+                                                           samples, seed, fast_kdf)
+            for name in os.listdir(directory):
+                entry = os.path.join(directory, name)
+                if os.path.isdir(entry):
+                    shutil.rmtree(entry)  # the login activity log, shards
+                else:
+                    os.remove(entry)
+    finally:
+        shutil.rmtree(directory)
+    return report
+
+
+def print_ops(report):
+    print(f"{'size':>9} {'operation':<13} {'ops/sec':>11} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for size, results in report["sizes"].items():
+        for operation in OPERATIONS:
+            row = results[operation]
+            print(f"{size:>9} {operation:<13} {row['ops_per_second'] or 0:>11} "
+                  f"{row['p50_ms']:>10} {row['p95_ms']:>10} {row['p99_ms']:>10}")
+        if "peak_rss_bytes" in results:
+            print(f"{size:>9} {'peak memory':<13} {results['peak_rss_bytes'] / 2 ** 20:>10.1f}M")
+
+
+def compare_ops(old, new, threshold):
+    """
+    Print how each operation's p50 latency moved between two reports.
+    Returns True if any got slower by more than threshold (a fraction).
+    """
+    regressed = False
+    for size, results in new["sizes"].items():
+        before = old["sizes"].get(size)
+        if before is None:
+            continue
+        for operation in OPERATIONS:
+            if operation not in before:
+                continue
+            was, now = before[operation]["p50_ms"], results[operation]["p50_ms"]
+            change = (now - was) / was if was else 0.0
+            flag = ""
+            if change > threshold:
+                flag = "  REGRESSION"
+                regressed = True
+            print(f"{size:>9} {operation:<13} p50 {was:>10} -> {now:>10} ms ({change:+.1%}){flag}")
+    return regressed
+
+
+def print_results(results):
+    for key, value in results.items():
+        print(f"{key:>32}: {value}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Student system benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    memory = commands.add_parser("memory", help="dict vs compact record memory use")
+    memory.add_argument("--students", type=int, default=100000)
+    memory.add_argument("--json", help="also write the results to this file")
+
+    kdf = commands.add_parser("kdf", help="password hashing logins/sec per cost")
+    kdf.add_argument("--kdf", choices=("scrypt", "pbkdf2"), action="append",
+                     help="KDF to measure (repeatable; default: all available)")
+    kdf.add_argument("--costs", type=int, nargs="+",
+                     help="scrypt N or PBKDF2 iterations to try")
+    kdf.add_argument("--logins", type=int, default=64)
+    kdf.add_argument("--workers", type=int, default=os.cpu_count())
+    kdf.add_argument("--json", help="also write the results to this file")
+
+    ops = commands.add_parser("ops", help="time the StudentSystem operations per roster size")
+    ops.add_argument("--sizes", type=int, nargs="+", default=list(OPS_SIZES))
+    ops.add_argument("--engine", default=os.environ.get("STUDENT_STORAGE", "json"),
+                     help="storage engine to measure")
+    ops.add_argument("--samples", type=int, default=50, help="calls timed per operation")
+    ops.add_argument("--seed", type=int, default=0)
+    ops.add_argument("--fast-kdf", action="store_true",
+                     help="use a very low password hashing cost")
+    ops.add_argument("--json", help="also write the results to this file")
+    ops.add_argument("--compare", help="results file of an earlier run to compare against")
+    ops.add_argument("--threshold", type=float, default=0.10,
+                     help="p50 slowdown counted as a regression (default 0.10)")
+
+    snapshot = commands.add_parser("snapshot", help="JSON vs binary data file save/load time and size")
+    snapshot.add_argument("--students", type=int, default=100000)
+    snapshot.add_argument("--json", help="also write the results to this file")
+
+    args = parser.parse_args(argv)
+    if args.command == "ops":
+        report = bench_ops(args.sizes, args.engine, args.samples, args.seed, args.fast_kdf)
+        print_ops(report)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(report, f, indent=4)
+        if args.compare:
+            with open(args.compare) as f:
+                if compare_ops(json.load(f), report, args.threshold):
+                    return 1
+        return 0
+    if args.command == "memory":
+        results = bench_memory(args.students)
+    elif args.command == "kdf":
+        kdfs = args.kdf or (["scrypt", "pbkdf2"] if HAVE_SCRYPT else ["pbkdf2"])
+        results = bench_kdf(kdfs, args.costs, args.logins, args.workers)
+    elif args.command == "snapshot":
+        results = bench_snapshot(args.students)
+
+    print_results(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
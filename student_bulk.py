@@ -0,0 +1,283 @@
+# ------------------------------------------------------------
+# Bulk Import and Export for the Student Registration and Login System
+# ------------------------------------------------------------
+# Usage (through student_system.py):
+#   python student_system.py import roster.csv [--commit-every N] [--workers N]
+#   python student_system.py export roster.jsonl
+#   python student_system.py export students.json   (or students.snap)
+#   python student_system.py audit [--workers N] [--report issues.json]
+# Import files are .csv (with a header row) or .jsonl (one object per
+# line) with the columns name, student_id, email and password. Rows
+# with password_hash instead of password (such as an export) are taken
+# as they are, and registered_on, login_count and last_login are kept
+# when a row has them. Rows are read, validated and hashed a chunk at
+# a time, so the input never has to fit in memory. Exports to .json or
+# .snap write a whole data file (students.json layout, or a binary
+# snapshot) that any storage engine can load.
+# An audit checks every stored student against the registration rules
+# (see student_validation.py) in one pass and reports what it finds.
+# ------------------------------------------------------------
+
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from student_records import FIELDS
+from student_storage import write_snapshot
+from student_system import Fore, hash_password, new_record
+from student_validation import (MIN_PASSWORD_LENGTH, REQUIRED_ID_RE, check_rows, clean_email, clean_id,
+                                clean_name, validate)
+
+# Rows validated and hashed together
+CHUNK_SIZE = 5000
+
+# Export extensions that write a data file, and its snapshot format
+SNAPSHOT_EXTENSIONS = {".json": "json", ".snap": "binary"}
+
+# Number of rejected rows listed in the import report (and of issues
+# of each kind printed by an audit)
+MAX_REPORTED_ERRORS = 20
+
+
+def file_format(path):
+    """
+    Return "csv" or "jsonl" based on the file extension.
+    Raises ValueError for anything else.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type '{extension}' (use .csv or .jsonl)")
+
+
+def read_rows(path):
+    """
+    Stream rows from a .csv or .jsonl file.
+    Yields (line_number, row) pairs where row is a dictionary, or the
+    reason as a string for a .jsonl line that is not a JSON object.
+    """
+    with open(path, 'r', newline='') as f:
+        if file_format(path) == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as e:
+                    yield line_number, f"Not valid JSON ({e})."
+                    continue
+                if isinstance(row, dict):
+                    yield line_number, row
+                else:
+                    yield line_number, "Not a JSON object."
+
+
+def history(row):
+    """
+    Return the registered_on, login_count and last_login values of a
+    row that has them (such as an export), to keep in place of the ones
+    new_record() starts with. CSV gives every value as text, and an
+    empty last_login as "".
+    Returns a dictionary, or the reason as a string if one is invalid.
+    """
+    fields = {}
+    if row.get("registered_on"):
+        fields["registered_on"] = row["registered_on"]
+    login_count = row.get("login_count")
+    if login_count not in (None, ""):
+        try:
+            fields["login_count"] = int(login_count)
+        except (TypeError, ValueError):
+            return f"Login count '{login_count}' is not a whole number."
+        if fields["login_count"] < 0:
+            return f"Login count '{login_count}' is negative."
+    if row.get("last_login"):
+        fields["last_login"] = row["last_login"]
+    return fields
+
+
+def normalize(row):
+    """
+    Clean up one input row the same way register() cleans up its prompts.
+    Returns (student_id, name, email, password, password_hash, history).
+    """
+    return (clean_id(row.get("student_id") or row.get("id") or ""),
+            clean_name(row.get("name") or ""),
+            clean_email(row.get("email") or ""),
+            row.get("password") or "",
+            row.get("password_hash") or "",
+            history(row))
+
+
+def validate_chunk(chunk, students, seen, lookups, seen_emails):
+    """
+    Check a chunk of normalized rows against the register() rules and
+    against IDs and emails already in the store (lookups is the
+    system's LookupIndex) or earlier in the import.
+    Rows that could not be read at all are their reason (a string) and
+    are rejected with it.
+    Returns (accepted, errors): accepted rows keep their normalized form,
+    errors are (line_number, student_id, message) tuples.
+    """
+    accepted = []
+    errors = []
+    # First format problem of each row, by line number
+    problems = {}
+    rows = ((line_number, row[0], row[1], row[2]) for line_number, row in chunk
+            if not isinstance(row, str))
+    for issue in check_rows(rows, REQUIRED_ID_RE):
+        problems.setdefault(issue.position, issue.message)
+    for line_number, row in chunk:
+        if isinstance(row, str):
+            errors.append((line_number, "", row))
+            continue
+        student_id, name, email, password, password_hash, fields = row
+        if not name or not student_id or not email or not (password or password_hash):
+            message = "All fields are required."
+        elif isinstance(fields, str):
+            message = fields
+        elif password and len(password) < MIN_PASSWORD_LENGTH:
+            message = f"Password must be at least {MIN_PASSWORD_LENGTH} characters long."
+        elif line_number in problems:
+            message = problems[line_number]
+        elif student_id in seen or student_id in students:
+            message = f"Student ID '{student_id}' is already registered."
+        elif email in seen_emails or lookups.by_email(email) is not None:
+            message = f"Email '{email}' is already registered."
+        else:
+            seen.add(student_id)
+            seen_emails.add(email)
+            accepted.append(row)
+            continue
+        errors.append((line_number, student_id, message))
+    return accepted, errors
+
+
+def hash_passwords(passwords, pool):
+    """
+    Hash a list of passwords, in worker processes when a pool is given.
+    """
+    if pool is None:
+        return [hash_password(password) for password in passwords]
+    return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+def import_students(system, path, commit_every=0, workers=None):
+    """
+    Register every valid row of a .csv/.jsonl file.
+    New students are committed once at the end, or after every
+    commit_every students when that is set.
+    Returns a report dictionary with the imported/rejected counts and
+    the errors found.
+    """
+    students = system.students
+    lookups = system.lookup_index()
+    seen = set()
+    seen_emails = set()
+    report = {"imported": 0, "rejected": 0, "errors": []}
+    rows = ((line_number, row if isinstance(row, str) else normalize(row))
+            for line_number, row in read_rows(path))
+    pool = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+    try:
+        with students.batch():
+            uncommitted = 0
+            while True:
+                chunk = list(islice(rows, CHUNK_SIZE))
+                if not chunk:
+                    break
+                accepted, errors = validate_chunk(chunk, students, seen, lookups, seen_emails)
+                report["rejected"] += len(errors)
+                report["errors"].extend(errors[:MAX_REPORTED_ERRORS - len(report["errors"])])
+
+                to_hash = [row[3] for row in accepted if not row[4]]
+                hashes = iter(hash_passwords(to_hash, pool))
+                for student_id, name, email, password, password_hash, fields in accepted:
+                    record = new_record(name, email, password_hash or next(hashes))
+                    record.update(fields)
+                    system.add_record(student_id, record)
+
+                report["imported"] += len(accepted)
+                uncommitted += len(accepted)
+                if commit_every and uncommitted >= commit_every:
+                    students.flush()
+                    uncommitted = 0
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return report
+
+
+def print_import_report(report):
+    """
+    Print the outcome of import_students().
+    """
+    print(Fore.GREEN + f"Imported {report['imported']} students.")
+    if report["rejected"]:
+        print(Fore.YELLOW + f"Rejected {report['rejected']} rows:")
+        for line_number, student_id, message in report["errors"]:
+            print(f"  line {line_number} ({student_id or 'no ID'}): {message}")
+        if report["rejected"] > len(report["errors"]):
+            print(f"  ... and {report['rejected'] - len(report['errors'])} more")
+
+
+def audit_students(students, workers=None):
+    """
+    Check every stored student against the registration rules, with
+    the format checks spread over workers processes.
+    Returns a ValidationReport (see student_validation.py); positions
+    count students in the store's order.
+    """
+    rows = ((position, student_id, record["name"], record["email"])
+            for position, (student_id, record) in enumerate(students.items(), 1))
+    return validate(rows, workers)
+
+
+def print_audit_report(report, limit=MAX_REPORTED_ERRORS):
+    """
+    Print the outcome of audit_students(): a count per kind of issue
+    and the first few issues of each kind.
+    """
+    if not report.issues:
+        print(Fore.GREEN + f"Checked {report.checked} students: no issues found.")
+        return
+    print(Fore.YELLOW + f"Checked {report.checked} students: {len(report.issues)} issues.")
+    shown = {}
+    for kind, count in sorted(report.counts().items()):
+        print(f"  {kind}: {count}")
+    for issue in report.issues:
+        if shown.get(issue.kind, 0) < limit:
+            shown[issue.kind] = shown.get(issue.kind, 0) + 1
+            print(f"  #{issue.position} ({issue.student_id or 'no ID'}): {issue.message}")
+
+
+def export_students(students, path):
+    """
+    Write every student to a .csv or .jsonl file, one record at a time,
+    or to a data file (.json or .snap, see SNAPSHOT_EXTENSIONS).
+    Returns the number of students written.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in SNAPSHOT_EXTENSIONS:
+        write_snapshot(path, students, snapshot_format=SNAPSHOT_EXTENSIONS[extension])
+        return len(students)
+    count = 0
+    with open(path, 'w', newline='') as f:
+        if file_format(path) == "csv":
+            writer = csv.writer(f)
+            writer.writerow(("student_id",) + FIELDS)
+            for student_id, record in students.items():
+                writer.writerow([student_id] + [record[field] for field in FIELDS])
+                count += 1
+        else:
+            for student_id, record in students.items():
+                f.write(json.dumps(dict(record, student_id=student_id)) + "\n")
+                count += 1
+    return count
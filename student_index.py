@@ -0,0 +1,461 @@
+# ------------------------------------------------------------
+# Search Index for the Student Registration and Login System
+# ------------------------------------------------------------
+# Keeps lowercased student IDs and names in two structures:
+#   - a trigram index (3-letter piece -> student IDs) for substring search
+#   - a sorted list of (key, student ID) pairs for prefix search
+# Both are updated one student at a time on register/delete, so a query
+# only looks at students that can actually match.
+# LookupIndex keeps exact-match secondary keys (email -> ID, normalized
+# name -> IDs) in hash maps, and can be saved next to the data file so
+# that it is not rebuilt from every record on each start. The saved file
+# is searched in place, so loading it does not read every student
+# either.
+# ------------------------------------------------------------
+
+import heapq
+import json
+import mmap
+import os
+import struct
+from bisect import bisect_left, insort
+
+
+# Match ranks: lower is better
+EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+
+def trigrams(text):
+    """
+    Return the set of 3-character pieces of text.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """
+    Incrementally maintained substring/prefix index over IDs and names.
+    """
+
+    def __init__(self):
+        self._keys = {}      # student ID -> (lowercased ID, lowercased name)
+        self._grams = {}     # trigram -> set of student IDs
+        self._short = set()  # IDs whose ID or name is too short for a trigram
+        self._sorted = []    # sorted (key, student ID) pairs for prefix search
+
+    @classmethod
+    def build(cls, records):
+        """
+        Build an index from (student_id, record) pairs.
+        The prefix list is sorted once at the end instead of per student.
+        """
+        index = cls()
+        for student_id, data in records:
+            index._add_terms(student_id, data["name"])
+        index._sorted = sorted((key, student_id)
+                               for student_id, keys in index._keys.items() for key in keys)
+        return index
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, student_id, name):
+        """
+        Index one student (replacing any previous entry for the ID).
+        """
+        if student_id in self._keys:
+            self.remove(student_id)
+        for key in self._add_terms(student_id, name):
+            insort(self._sorted, (key, student_id))
+
+    def remove(self, student_id):
+        """
+        Drop one student from the index (no-op if not indexed).
+        """
+        keys = self._keys.pop(student_id, None)
+        if keys is None:
+            return
+        for gram in trigrams(keys[0]) | trigrams(keys[1]):
+            postings = self._grams[gram]
+            postings.discard(student_id)
+            if not postings:
+                del self._grams[gram]
+        self._short.discard(student_id)
+        for key in keys:
+            position = bisect_left(self._sorted, (key, student_id))
+            if position < len(self._sorted) and self._sorted[position] == (key, student_id):
+                del self._sorted[position]
+
+    def search(self, query, prefix=False, limit=None, offset=0):
+        """
+        Find students whose ID or name contains query (or starts with it
+        when prefix is True). Matching is case-insensitive.
+        Results are ranked: exact match, prefix match, match at the start
+        of a word in the name, then any other substring match; ties are
+        ordered by name and ID.
+        Returns (student_ids, total) where student_ids holds at most
+        limit results starting at offset, and total counts every match.
+        """
+        query = query.lower()
+        if not query:
+            return [], 0
+        if prefix:
+            candidates = self._prefix_candidates(query)
+        else:
+            candidates = self._substring_candidates(query)
+
+        ranked = []
+        for student_id in candidates:
+            rank = match_rank(query, *self._keys[student_id])
+            if rank is not None and (rank <= PREFIX or not prefix):
+                ranked.append((rank, self._keys[student_id][1], student_id))
+        return ranked_page(ranked, limit, offset)
+
+    # --- Helpers -----------------------------------------------
+
+    def _add_terms(self, student_id, name):
+        keys = (student_id.lower(), name.lower())
+        self._keys[student_id] = keys
+        for gram in trigrams(keys[0]) | trigrams(keys[1]):
+            self._grams.setdefault(gram, set()).add(student_id)
+        if min(len(keys[0]), len(keys[1])) < 3:
+            self._short.add(student_id)
+        return keys
+
+    def _prefix_candidates(self, query):
+        candidates = set()
+        position = bisect_left(self._sorted, (query,))
+        while position < len(self._sorted) and self._sorted[position][0].startswith(query):
+            candidates.add(self._sorted[position][1])
+            position += 1
+        return candidates
+
+    def _substring_candidates(self, query):
+        if len(query) >= 3:
+            postings = []
+            for gram in trigrams(query):
+                if gram not in self._grams:
+                    return set()
+                postings.append(self._grams[gram])
+            postings.sort(key=len)
+            return postings[0].intersection(*postings[1:])
+        # Too short for a trigram: take every trigram that contains it
+        candidates = set(self._short)
+        for gram, postings in self._grams.items():
+            if query in gram:
+                candidates |= postings
+        return candidates
+
+
+def match_rank(query, student_key, name_key):
+    """
+    Rank of a lowercased ID and name for query (already lowercased), or
+    None if neither contains it.
+    """
+    if query == student_key or query == name_key:
+        return EXACT
+    if student_key.startswith(query) or name_key.startswith(query):
+        return PREFIX
+    if " " + query in name_key:
+        return WORD_PREFIX
+    if query in student_key or query in name_key:
+        return SUBSTRING
+    return None
+
+
+def ranked_page(ranked, limit=None, offset=0):
+    """
+    Sort (rank, lowercased name, student ID) triples and cut out one page.
+    Returns (student_ids, total).
+    """
+    if limit is None:
+        page = sorted(ranked)[offset:]
+    else:
+        page = heapq.nsmallest(offset + limit, ranked)[offset:]
+    return [student_id for _, _, student_id in page], len(ranked)
+
+
+def rank_matches(query, matches, limit=None, offset=0):
+    """
+    Rank (student_id, name) pairs the way SearchIndex.search() ranks its
+    matches, for stores that find the matches themselves (see
+    SqliteStore.search). Pairs that do not contain query are dropped.
+    Returns (student_ids, total) like SearchIndex.search().
+    """
+    query = query.lower()
+    if not query:
+        return [], 0
+    ranked = []
+    for student_id, name in matches:
+        name_key = name.lower()
+        rank = match_rank(query, student_id.lower(), name_key)
+        if rank is not None:
+            ranked.append((rank, name_key, student_id))
+    return ranked_page(ranked, limit, offset)
+
+
+def normalize_email(email):
+    return email.strip().lower()
+
+
+def normalize_name(name):
+    """
+    Case-insensitive form of a name with runs of spaces collapsed.
+    """
+    return " ".join(name.lower().split())
+
+
+# File written by LookupIndex.save(): a header, the signature as JSON,
+# then three tables sorted by their first field -- ID -> (email, name),
+# email -> ID (in the order the students took the email) and
+# name -> ID. A table is its entry count and data size, the offsets of
+# its entries and the entries themselves (length-prefixed UTF-8
+# fields), so load() maps the file and finds keys by binary search
+# instead of reading every student
+LOOKUP_MAGIC = b"SLKP0002"
+LOOKUP_HEADER = struct.Struct("<8sI")  # magic, signature length
+TABLE_HEADER = struct.Struct("<QQ")    # entries, bytes of entry data
+OFFSET = struct.Struct("<Q")
+FIELD = struct.Struct("<I")
+
+
+def write_table(f, entries):
+    """
+    Write a table of entries (tuples of strings), sorted stably by the
+    first field.
+    """
+    encoded = sorted((tuple(field.encode() for field in entry) for entry in entries),
+                     key=lambda entry: entry[0])
+    data = [b"".join(FIELD.pack(len(field)) + field for field in entry) for entry in encoded]
+    offsets = [0]
+    for entry in data:
+        offsets.append(offsets[-1] + len(entry))
+    f.write(TABLE_HEADER.pack(len(data), offsets[-1]))
+    f.write(b"".join(OFFSET.pack(offset) for offset in offsets))
+    f.write(b"".join(data))
+
+
+class SavedTable:
+    """
+    One table of a saved LookupIndex, read in place from the mapped file.
+    """
+
+    def __init__(self, view, start):
+        self._view = view
+        self._count, size = TABLE_HEADER.unpack_from(view, start)
+        self._offsets = start + TABLE_HEADER.size
+        self._data = self._offsets + (self._count + 1) * OFFSET.size
+        self.end = self._data + size
+        if self.end > len(view):
+            raise ValueError("Truncated lookup table")
+
+    def __len__(self):
+        return self._count
+
+    def _span(self, position):
+        start, end = struct.unpack_from("<QQ", self._view, self._offsets + position * OFFSET.size)
+        return self._data + start, self._data + end
+
+    def _key(self, position):
+        start, _ = self._span(position)
+        (length,) = FIELD.unpack_from(self._view, start)
+        return self._view[start + FIELD.size:start + FIELD.size + length]
+
+    def _entry(self, position):
+        start, end = self._span(position)
+        fields = []
+        while start < end:
+            (length,) = FIELD.unpack_from(self._view, start)
+            start += FIELD.size + length
+            fields.append(self._view[start - length:start].decode())
+        return fields
+
+    def find(self, key):
+        """
+        Yield the other fields of every entry whose first field is key,
+        in table order.
+        """
+        key = key.encode()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        while low < self._count and self._key(low) == key:
+            yield self._entry(low)[1:]
+            low += 1
+
+    def __iter__(self):
+        for position in range(self._count):
+            yield self._entry(position)
+
+
+class LookupIndex:
+    """
+    Incrementally maintained email -> ID and name -> IDs maps.
+
+    An index read by load() keeps the saved tables in the mapped file
+    and only holds the students added or removed since in memory.
+    """
+
+    def __init__(self):
+        self._keys = {}    # student ID -> (normalized email, normalized name)
+        self._emails = {}  # normalized email -> student ID
+        self._shared = {}  # email -> other IDs using it (data from before emails were unique)
+        self._names = {}   # normalized name -> set of student IDs
+        self._view = None  # the mapped file of a loaded index, and its tables:
+        self._saved_ids = self._saved_emails = self._saved_names = None
+        self._replaced = set()  # saved IDs removed (and maybe re-added) since
+
+    @classmethod
+    def build(cls, records):
+        """
+        Build an index from (student_id, record) pairs.
+        """
+        index = cls()
+        for student_id, data in records:
+            index.add(student_id, data)
+        return index
+
+    def __len__(self):
+        saved = 0 if self._view is None else len(self._saved_ids) - len(self._replaced)
+        return len(self._keys) + saved
+
+    def close(self):
+        """
+        Unmap the saved file of a loaded index.
+        """
+        if self._view is not None:
+            self._view.close()
+            self._view = self._saved_ids = self._saved_emails = self._saved_names = None
+            self._replaced = set()
+
+    def _saved_keys(self, student_id):
+        """
+        Return the saved (email, name) of a student not removed since, or None.
+        """
+        if self._view is None or student_id in self._replaced:
+            return None
+        return next(self._saved_ids.find(student_id), None)
+
+    def add(self, student_id, data):
+        """
+        Index one student (replacing any previous entry for the ID).
+        """
+        self.remove(student_id)
+        self._add_keys(student_id, normalize_email(data["email"]), normalize_name(data["name"]))
+
+    def _add_keys(self, student_id, email, name):
+        self._keys[student_id] = (email, name)
+        owner = self._emails.setdefault(email, student_id)
+        if owner != student_id:
+            self._shared.setdefault(email, set()).add(student_id)
+        self._names.setdefault(name, set()).add(student_id)
+
+    def remove(self, student_id):
+        """
+        Drop one student from the index (no-op if not indexed).
+        """
+        if self._saved_keys(student_id) is not None:
+            self._replaced.add(student_id)
+            return
+        keys = self._keys.pop(student_id, None)
+        if keys is None:
+            return
+        email, name = keys
+        others = self._shared.get(email)
+        if others is not None:
+            # Hand the email to another student who still uses it
+            others.discard(student_id)
+            if self._emails[email] == student_id:
+                self._emails[email] = others.pop()
+            if not others:
+                del self._shared[email]
+        elif self._emails.get(email) == student_id:
+            del self._emails[email]
+        ids = self._names[name]
+        ids.discard(student_id)
+        if not ids:
+            del self._names[name]
+
+    def by_email(self, email):
+        """
+        Return the ID of the student using email, or None.
+        """
+        email = normalize_email(email)
+        if self._view is not None:
+            # Saved students took their emails before the ones added since
+            for (student_id,) in self._saved_emails.find(email):
+                if student_id not in self._replaced:
+                    return student_id
+        return self._emails.get(email)
+
+    def by_name(self, name):
+        """
+        Return the sorted IDs of students with this name (ignoring case
+        and spacing).
+        """
+        name = normalize_name(name)
+        ids = set(self._names.get(name, ()))
+        if self._view is not None:
+            ids.update(student_id for (student_id,) in self._saved_names.find(name)
+                       if student_id not in self._replaced)
+        return sorted(ids)
+
+    # --- Persistence -------------------------------------------
+
+    def save(self, path, signature):
+        """
+        Write the index to path, tagged with signature (see
+        BufferedStore.signature()) so load() can tell if it is stale.
+        The file is replaced atomically.
+        """
+        keys, emails, names = [], [], []
+        if self._view is not None:
+            keys = [entry for entry in self._saved_ids if entry[0] not in self._replaced]
+            emails = [entry for entry in self._saved_emails if entry[1] not in self._replaced]
+            names = [entry for entry in self._saved_names if entry[1] not in self._replaced]
+        keys += [(student_id, email, name) for student_id, (email, name) in self._keys.items()]
+        # Each email's owner before the students sharing it
+        emails += [(email, student_id) for email, student_id in self._emails.items()]
+        emails += [(email, student_id) for email, others in self._shared.items() for student_id in others]
+        names += [(name, student_id) for name, ids in self._names.items() for student_id in ids]
+        signature = json.dumps(signature).encode()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(LOOKUP_HEADER.pack(LOOKUP_MAGIC, len(signature)) + signature)
+            for entries in (keys, emails, names):
+                write_table(f, entries)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, signature):
+        """
+        Map an index saved by save().
+        Returns None if there is none, or if it was saved for another
+        version of the data (its signature differs).
+        """
+        try:
+            with open(path, 'rb') as f:
+                view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            magic, length = LOOKUP_HEADER.unpack_from(view)
+            start = LOOKUP_HEADER.size
+            # JSON turns the signature's tuples into lists
+            if magic != LOOKUP_MAGIC or \
+                    json.loads(view[start:start + length]) != json.loads(json.dumps(signature)):
+                view.close()
+                return None
+            index = cls()
+            index._saved_ids = SavedTable(view, start + length)
+            index._saved_emails = SavedTable(view, index._saved_ids.end)
+            index._saved_names = SavedTable(view, index._saved_emails.end)
+        except (ValueError, struct.error):
+            view.close()
+            return None
+        index._view = view
+        return index
@@ -0,0 +1,168 @@
+# ------------------------------------------------------------
+# Sorted, Paginated Listings for the Student Registration and Login System
+# ------------------------------------------------------------
+# An Ordering keeps (sort key, student ID) pairs for one sort order in
+# a sorted list. It is sorted once when first needed and then updated
+# one student at a time on register/login/delete, so showing a page is
+# a slice of the list, never a sort of the whole roster.
+# Pages can be reached by offset or by cursor (the position just after
+# the last row shown), and are formatted into one string so that each
+# page is written with a single call.
+# ------------------------------------------------------------
+
+import csv
+import io
+import json
+from bisect import bisect_left, bisect_right, insort
+
+# Sort orders: name -> function of (student_id, record) giving the key.
+# Ties are broken by student ID.
+SORT_KEYS = {
+    "id": lambda student_id, data: student_id,
+    "name": lambda student_id, data: data["name"].lower(),
+    "registered": lambda student_id, data: data["registered_on"],
+    "logins": lambda student_id, data: data["login_count"],
+}
+
+# Columns that can be listed (the password hash never is), with the
+# labels used by the text format
+LIST_FIELDS = {
+    "student_id": "ID",
+    "name": "Name",
+    "email": "Email",
+    "registered_on": "Registered",
+    "login_count": "Logins",
+    "last_login": "Last login",
+}
+
+# Columns shown when none are chosen (the original listing)
+DEFAULT_FIELDS = ("name", "student_id", "email", "registered_on", "login_count")
+
+OUTPUT_FORMATS = ("text", "jsonl", "csv")
+
+
+class Ordering:
+    """
+    Incrementally maintained sort order over the roster.
+    """
+
+    def __init__(self, sort):
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort order '{sort}' (use {', '.join(SORT_KEYS)})")
+        self._key = SORT_KEYS[sort]
+        self._keys = {}    # student ID -> sort key
+        self._sorted = []  # sorted (sort key, student ID) pairs
+
+    @classmethod
+    def build(cls, sort, records):
+        """
+        Build an ordering from (student_id, record) pairs, sorting once.
+        """
+        ordering = cls(sort)
+        for student_id, data in records:
+            ordering._keys[student_id] = ordering._key(student_id, data)
+        ordering._sorted = sorted((key, student_id) for student_id, key in ordering._keys.items())
+        return ordering
+
+    def __len__(self):
+        return len(self._sorted)
+
+    def add(self, student_id, data):
+        """
+        Place one student (moving them if they are already placed).
+        """
+        self.remove(student_id)
+        key = self._key(student_id, data)
+        self._keys[student_id] = key
+        insort(self._sorted, (key, student_id))
+
+    def remove(self, student_id):
+        """
+        Drop one student (no-op if not placed).
+        """
+        key = self._keys.pop(student_id, None)
+        if key is None:
+            return
+        position = bisect_left(self._sorted, (key, student_id))
+        if position < len(self._sorted) and self._sorted[position] == (key, student_id):
+            del self._sorted[position]
+
+    def page(self, limit=None, offset=0, after=None, reverse=False):
+        """
+        Return (student_ids, cursor) for one page.
+        after is a cursor from an earlier page; offset counts from there
+        (or from the start). cursor is None on the last page.
+        """
+        entries = self._sorted
+        total = len(entries)
+        if after is None:
+            start = 0
+        elif reverse:
+            start = total - bisect_left(entries, tuple(after))
+        else:
+            start = bisect_right(entries, tuple(after))
+        start = min(total, start + offset)
+        stop = total if limit is None else min(total, start + limit)
+        if reverse:
+            page = [entries[total - 1 - i] for i in range(start, stop)]
+        else:
+            page = entries[start:stop]
+        cursor = list(page[-1]) if page and stop < total else None
+        return [student_id for _, student_id in page], cursor
+
+
+def encode_cursor(cursor):
+    return json.dumps(cursor, separators=(",", ":"))
+
+
+def decode_cursor(text):
+    """
+    Parse a cursor printed by encode_cursor().
+    Raises ValueError if it is not one.
+    """
+    cursor = json.loads(text)
+    if not (isinstance(cursor, list) and len(cursor) == 2 and isinstance(cursor[1], str)):
+        raise ValueError(f"Invalid cursor: {text}")
+    return cursor
+
+
+def parse_fields(text):
+    """
+    Turn "name,email" into a tuple of listable columns.
+    Raises ValueError for unknown columns.
+    """
+    fields = tuple(field.strip() for field in text.split(",") if field.strip())
+    unknown = [field for field in fields if field not in LIST_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields: {', '.join(unknown) or '(none)'} "
+                         f"(choose from {', '.join(LIST_FIELDS)})")
+    return fields
+
+
+def format_page(students, fields=DEFAULT_FIELDS, output="text", number=1, header=True):
+    """
+    Format Student objects (see student_system.py) as one string.
+    number is the position of the first student (text output), header
+    says whether to start CSV output with the column names.
+    """
+    buffer = io.StringIO()
+    if output == "csv":
+        writer = csv.writer(buffer, lineterminator="\n")
+        if header:
+            writer.writerow(fields)
+        for student in students:
+            writer.writerow([getattr(student, field) for field in fields])
+    elif output == "jsonl":
+        for student in students:
+            buffer.write(json.dumps({field: getattr(student, field) for field in fields}) + "\n")
+    else:
+        # For loop over the page, one block per student
+        for count, student in enumerate(students, number):
+            for position, field in enumerate(fields):
+                value = getattr(student, field)
+                if value is None:
+                    value = "Never"
+                prefix = f"{count}. " if position == 0 else "   "
+                buffer.write(f"{prefix}{LIST_FIELDS[field]}: {value}\n")
+            buffer.write("-" * 40 + "\n")
+    return buffer.getvalue()
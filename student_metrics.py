@@ -0,0 +1,282 @@
+# ------------------------------------------------------------
+# Metrics and Profiling for the Student Registration and Login System
+# ------------------------------------------------------------
+# Every StudentSystem keeps a Metrics object with:
+#   - a latency histogram per operation (load, save, register, login,
+#     search, delete, ... and hash_password), with call and error counts
+#   - counters such as the bytes written by save_data()
+#   - gauges read when exported, such as the number of students
+# Metrics can be exported as a JSON snapshot or as Prometheus text,
+# once or every few seconds by a background thread.
+# Settings (environment variables, or the matching command-line flags):
+#   STUDENT_METRICS           file to export to (.prom/.txt for
+#                             Prometheus text, anything else JSON)
+#   STUDENT_METRICS_INTERVAL  seconds between exports (default 60)
+#   STUDENT_PROFILE           cprofile or tracemalloc
+# ------------------------------------------------------------
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Histogram bucket upper bounds in seconds (Prometheus' defaults, plus
+# finer ones at the bottom for in-memory operations)
+BUCKETS = (0.00001, 0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Prefix of every exported metric name
+PREFIX = "student"
+
+PROFILE_MODES = ("cprofile", "tracemalloc")
+
+# Number of functions / allocation sites listed in a profile report
+PROFILE_TOP = 25
+
+
+class Histogram:
+    """
+    Latency histogram with fixed buckets (plus an overflow bucket).
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.calls = 0
+        self.errors = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.calls += 1
+
+    def quantile(self, q):
+        """
+        Estimate a quantile (0..1) as the upper bound of its bucket.
+        """
+        if not self.calls:
+            return None
+        rank = q * self.calls
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def snapshot(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "seconds": round(self.total, 6),
+            "mean_ms": round(self.total / self.calls * 1000, 3) if self.calls else None,
+            "p50_le_ms": _ms(self.quantile(0.50)),
+            "p99_le_ms": _ms(self.quantile(0.99)),
+            "buckets": {str(bound): count for bound, count in zip(BUCKETS, self.counts)},
+            "overflow": self.counts[-1],
+        }
+
+
+def _ms(seconds):
+    if seconds is None or seconds == float("inf"):
+        return seconds if seconds is None else "inf"
+    return round(seconds * 1000, 3)
+
+
+class Metrics:
+    """
+    Thread-safe registry of operation histograms, counters and gauges.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.operations = {}  # operation name -> Histogram
+        self.counters = {}    # counter name -> number
+        self.gauges = {}      # gauge name -> function returning a number
+        self.started = time.time()
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, function):
+        """
+        Register a value that is read each time metrics are exported.
+        """
+        self.gauges[name] = function
+
+    def observe(self, operation, seconds, failed=False):
+        with self._lock:
+            histogram = self.operations.get(operation)
+            if histogram is None:
+                histogram = self.operations[operation] = Histogram()
+            histogram.observe(seconds)
+            if failed:
+                histogram.errors += 1
+
+    @contextmanager
+    def timer(self, operation):
+        """
+        Time the body of a with block as one call of operation.
+        An exception counts as an error (and is re-raised).
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield
+            failed = False
+        finally:
+            self.observe(operation, time.perf_counter() - start, failed)
+
+    def snapshot(self):
+        """
+        Return every metric as a JSON-friendly dictionary.
+        """
+        gauges = {}
+        for name, function in list(self.gauges.items()):
+            try:
+                gauges[name] = function()
+            except Exception:
+                # A gauge must never break an export (e.g. store closed)
+                gauges[name] = None
+        with self._lock:
+            return {
+                "timestamp": round(time.time(), 3),
+                "uptime_seconds": round(time.time() - self.started, 3),
+                "operations": {name: histogram.snapshot() for name, histogram in sorted(self.operations.items())},
+                "counters": dict(sorted(self.counters.items())),
+                "gauges": gauges,
+            }
+
+    def to_prometheus(self):
+        """
+        Return every metric in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        lines = [f"# HELP {PREFIX}_operation_seconds Time spent per operation.",
+                 f"# TYPE {PREFIX}_operation_seconds histogram"]
+        with self._lock:
+            operations = [(name, list(h.counts), h.total, h.calls) for name, h in sorted(self.operations.items())]
+        for name, counts, total, calls in operations:
+            cumulative = 0
+            for bound, count in zip(BUCKETS, counts):
+                cumulative += count
+                lines.append(f'{PREFIX}_operation_seconds_bucket{{operation="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PREFIX}_operation_seconds_bucket{{operation="{name}",le="+Inf"}} {calls}')
+            lines.append(f'{PREFIX}_operation_seconds_sum{{operation="{name}"}} {total}')
+            lines.append(f'{PREFIX}_operation_seconds_count{{operation="{name}"}} {calls}')
+        lines.append(f"# TYPE {PREFIX}_operation_errors_total counter")
+        for name, data in snapshot["operations"].items():
+            lines.append(f'{PREFIX}_operation_errors_total{{operation="{name}"}} {data["errors"]}')
+        for name, value in snapshot["counters"].items():
+            lines.append(f"# TYPE {PREFIX}_{name} counter")
+            lines.append(f"{PREFIX}_{name} {value}")
+        for name, value in snapshot["gauges"].items():
+            if value is not None:
+                lines.append(f"# TYPE {PREFIX}_{name} gauge")
+                lines.append(f"{PREFIX}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        """
+        Write the metrics to path: Prometheus text for .prom/.txt files,
+        a JSON snapshot otherwise. The file is replaced atomically.
+        """
+        if os.path.splitext(path)[1].lower() in (".prom", ".txt"):
+            text = self.to_prometheus()
+        else:
+            text = json.dumps(self.snapshot(), indent=4)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+
+def instrumented(operation):
+    """
+    Decorator for methods of objects with a metrics attribute: each
+    call is timed as one call of operation.
+    """
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.timer(operation):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class MetricsExporter:
+    """
+    Background thread exporting metrics to a file every interval
+    seconds, and once more when stopped.
+    """
+
+    def __init__(self, metrics, path, interval=60):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.metrics.export(self.path)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.metrics.export(self.path)
+            except OSError as e:
+                print(f"Warning: could not export metrics ({e})", file=sys.stderr)
+
+
+@contextmanager
+def profiling(mode, output=None):
+    """
+    Profile the body of a with block.
+    mode is None (do nothing), "cprofile" (statistics saved to output,
+    default student_profile.pstats) or "tracemalloc" (largest
+    allocation sites and peak memory). A summary goes to stderr.
+    """
+    if not mode:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode '{mode}' (use {' or '.join(PROFILE_MODES)})")
+    if mode == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            output = output or "student_profile.pstats"
+            profiler.dump_stats(output)
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_TOP)
+            print(report.getvalue() + f"Profile saved to {output}", file=sys.stderr)
+    else:
+        tracemalloc.start()
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"Peak traced memory: {peak / 2 ** 20:.1f} MiB", file=sys.stderr)
+            for stat in snapshot.statistics("lineno")[:PROFILE_TOP]:
+                print(f"  {stat}", file=sys.stderr)
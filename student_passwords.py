@@ -0,0 +1,140 @@
+# ------------------------------------------------------------
+# Password Hashing for the Student Registration and Login System
+# ------------------------------------------------------------
+# Passwords are stored as salted, deliberately slow key-derivation
+# hashes so that identical passwords get different hashes and a leaked
+# students.json cannot be cracked at GPU speed. Stored formats:
+#   scrypt$<N>$<r>$<p>$<salt>$<key>        (default when available)
+#   pbkdf2_sha256$<iterations>$<salt>$<key>
+#   <64 hex digits>                         (legacy unsalted SHA-256)
+# Salt and key are base64. The cost is kept in every hash, so changing
+# the settings below never breaks existing logins: hashes made with
+# other settings (or legacy ones) are upgraded the next time their
+# owner logs in.
+# Settings (environment variables):
+#   STUDENT_KDF                scrypt or pbkdf2
+#   STUDENT_SCRYPT_N           scrypt CPU/memory cost (power of two)
+#   STUDENT_PBKDF2_ITERATIONS  PBKDF2-HMAC-SHA256 iterations
+# Use "python student_bench.py kdf" to see the logins/sec each cost
+# gives on this machine.
+# ------------------------------------------------------------
+
+import base64
+import hashlib
+import hmac
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# scrypt needs Python built against OpenSSL 1.1+; PBKDF2 is always there
+HAVE_SCRYPT = hasattr(hashlib, "scrypt")
+
+PASSWORD_KDF = os.environ.get("STUDENT_KDF", "scrypt" if HAVE_SCRYPT else "pbkdf2")
+SCRYPT_N = int(os.environ.get("STUDENT_SCRYPT_N", str(2 ** 14)))
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_ITERATIONS = int(os.environ.get("STUDENT_PBKDF2_ITERATIONS", "600000"))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    # Allow the memory scrypt needs (128 * r * n bytes) plus some slack
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2) + 1024 * 1024, dklen=KEY_BYTES)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+
+def hash_password(password, kdf=None, cost=None):
+    """
+    Hash a password with a fresh random salt.
+    kdf and cost (scrypt N or PBKDF2 iterations) default to the settings
+    above. A plain function so worker processes can run it.
+    """
+    kdf = kdf or PASSWORD_KDF
+    salt = os.urandom(SALT_BYTES)
+    if kdf == "scrypt":
+        n = cost or SCRYPT_N
+        key = _scrypt(password, salt, n, SCRYPT_R, SCRYPT_P)
+        return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(key)}"
+    if kdf == "pbkdf2":
+        iterations = cost or PBKDF2_ITERATIONS
+        key = _pbkdf2(password, salt, iterations)
+        return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(key)}"
+    raise ValueError(f"Unknown password KDF '{kdf}' (use scrypt or pbkdf2)")
+
+
+def needs_rehash(password_hash):
+    """
+    True if a stored hash was not made with the current settings.
+    """
+    if PASSWORD_KDF == "scrypt":
+        current = f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}$"
+    else:
+        current = f"pbkdf2_sha256${PBKDF2_ITERATIONS}$"
+    return not password_hash.startswith(current)
+
+
+def verify_password(password, password_hash):
+    """
+    Check a password against a stored hash of any supported format.
+    Returns (ok, needs_rehash): needs_rehash is only ever True for a
+    correct password whose hash should be replaced by hash_password().
+    """
+    parts = password_hash.split("$")
+    try:
+        if parts[0] == "scrypt" and len(parts) == 6:
+            n, r, p = int(parts[1]), int(parts[2]), int(parts[3])
+            key = _scrypt(password, base64.b64decode(parts[4]), n, r, p)
+            expected = base64.b64decode(parts[5])
+        elif parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+            key = _pbkdf2(password, base64.b64decode(parts[2]), int(parts[1]))
+            expected = base64.b64decode(parts[3])
+        elif len(parts) == 1 and len(password_hash) == 64:
+            key = hashlib.sha256(password.encode()).hexdigest().encode()
+            expected = password_hash.lower().encode()
+        else:
+            return False, False
+    except ValueError:
+        # Damaged hash (bad number or base64): no password matches it
+        return False, False
+    ok = hmac.compare_digest(key, expected)
+    return ok, ok and needs_rehash(password_hash)
+
+
+def hash_many(passwords, workers=None):
+    """
+    Hash many passwords at once, spread over worker processes.
+    Returns the hashes in the same order.
+    """
+    passwords = list(passwords)
+    if workers == 1 or len(passwords) < 2:
+        return [hash_password(password) for password in passwords]
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(hash_password, passwords, chunksize=max(1, len(passwords) // (4 * workers))))
+
+
+def _verify_pair(pair):
+    return verify_password(*pair)
+
+
+def verify_many(pairs, workers=None):
+    """
+    Verify many (password, password_hash) pairs at once, spread over
+    worker processes so every core is used.
+    Returns a list of (ok, needs_rehash) in the same order.
+    """
+    pairs = list(pairs)
+    if workers == 1 or len(pairs) < 2:
+        return [verify_password(password, password_hash) for password, password_hash in pairs]
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(_verify_pair, pairs, chunksize=max(1, len(pairs) // (4 * workers))))
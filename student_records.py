@@ -0,0 +1,169 @@
+# ------------------------------------------------------------
+# Compact Student Records
+# ------------------------------------------------------------
+# A student record normally lives in memory as a dict with six string
+# keys, a 64-character hex password hash and two timestamp strings.
+# StudentRecord keeps the same data in __slots__ instead:
+#   - SHA-256 hex hashes as 32 raw bytes
+#   - "YYYY-MM-DD HH:MM:SS" timestamps as integer epoch seconds
+# It still behaves like the dict (record["name"], dict(record), ...),
+# so the rest of the system does not need to know which one it has.
+# ------------------------------------------------------------
+
+import calendar
+import time
+from collections.abc import MutableMapping
+
+# Timestamp format used throughout the system
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Keys of a student record, in the order they are written to disk
+FIELDS = ("name", "email", "password_hash", "registered_on", "login_count", "last_login")
+
+
+def pack_hash(password_hash):
+    """
+    Return a 64-character hex hash as 32 raw bytes.
+    Any other hash format is kept as it is.
+    """
+    if len(password_hash) == 64:
+        try:
+            return bytes.fromhex(password_hash)
+        except ValueError:
+            pass
+    return password_hash
+
+
+def unpack_hash(value):
+    return value.hex() if isinstance(value, bytes) else value
+
+
+def pack_time(text):
+    """
+    Return a "YYYY-MM-DD HH:MM:SS" timestamp as epoch seconds.
+    None and timestamps in any other format are kept as they are.
+    """
+    if text is None or len(text) != 19:
+        return text
+    try:
+        return calendar.timegm((int(text[0:4]), int(text[5:7]), int(text[8:10]),
+                                int(text[11:13]), int(text[14:16]), int(text[17:19])))
+    except ValueError:
+        return text
+
+
+def unpack_time(value):
+    return time.strftime(TIME_FORMAT, time.gmtime(value)) if isinstance(value, int) else value
+
+
+class StudentRecord(MutableMapping):
+    """
+    Memory-compact student record with the same keys as the dict layout.
+    """
+
+    __slots__ = ("name", "email", "_hash", "_registered", "login_count", "_last_login")
+
+    def __init__(self, name, email, password_hash, registered_on, login_count=0, last_login=None):
+        self.name = name
+        self.email = email
+        self._hash = pack_hash(password_hash)
+        self._registered = pack_time(registered_on)
+        self.login_count = login_count
+        self._last_login = pack_time(last_login)
+
+    @classmethod
+    def from_mapping(cls, data):
+        """
+        Build a record from a dict (or any mapping) with the usual keys.
+        """
+        return cls(data["name"], data["email"], data["password_hash"], data["registered_on"],
+                   data.get("login_count", 0), data.get("last_login"))
+
+    @classmethod
+    def from_packed(cls, name, email, packed_hash, registered, login_count, last_login):
+        """
+        Build a record from fields already in the packed form (see
+        packed()), without converting them again.
+        """
+        record = cls.__new__(cls)
+        record.name = name
+        record.email = email
+        record._hash = packed_hash
+        record._registered = registered
+        record.login_count = login_count
+        record._last_login = last_login
+        return record
+
+    def packed(self):
+        """
+        Return (name, email, hash, registered_on, login_count, last_login)
+        with the hash and timestamps in their packed form.
+        """
+        return (self.name, self.email, self._hash, self._registered, self.login_count,
+                self._last_login)
+
+    def copy(self):
+        """
+        Return an independent copy without unpacking any field.
+        """
+        clone = StudentRecord.__new__(StudentRecord)
+        for slot in self.__slots__:
+            setattr(clone, slot, getattr(self, slot))
+        return clone
+
+    def to_dict(self):
+        return {key: self[key] for key in FIELDS}
+
+    def __getitem__(self, key):
+        if key == "name":
+            return self.name
+        if key == "email":
+            return self.email
+        if key == "password_hash":
+            return unpack_hash(self._hash)
+        if key == "registered_on":
+            return unpack_time(self._registered)
+        if key == "login_count":
+            return self.login_count
+        if key == "last_login":
+            return unpack_time(self._last_login)
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "name":
+            self.name = value
+        elif key == "email":
+            self.email = value
+        elif key == "password_hash":
+            self._hash = pack_hash(value)
+        elif key == "registered_on":
+            self._registered = pack_time(value)
+        elif key == "login_count":
+            self.login_count = value
+        elif key == "last_login":
+            self._last_login = pack_time(value)
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key):
+        raise TypeError("StudentRecord fields cannot be deleted")
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"StudentRecord({self.to_dict()!r})"
+
+
+def compact_hook(data):
+    """
+    json object_hook that turns student records into StudentRecord
+    objects as they are parsed, so the dict layout never has to exist
+    for the whole roster at once.
+    """
+    if "password_hash" in data and "name" in data:
+        return StudentRecord.from_mapping(data)
+    return data
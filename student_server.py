@@ -0,0 +1,344 @@
+# ------------------------------------------------------------
+# Network Service for the Student Registration and Login System
+# ------------------------------------------------------------
+# Usage:
+#   python student_system.py serve [--host H] [--port P] [--workers N]
+#   python student_server.py loadtest [--host H] [--port P] [--clients N]
+#                                     [--requests N] [--spawn]
+# Protocol: one JSON object per line in each direction over TCP.
+#   {"op": "register", "name": ..., "student_id": ..., "email": ..., "password": ...}
+#   {"op": "login", "student_id": ..., "password": ...}   -> {"token": ...}
+#       (or "email" instead of "student_id")
+#   {"op": "search", "query": ..., "limit": 20, "offset": 0}
+#   {"op": "profile", "token": ...}
+#   {"op": "logout", "token": ...}
+# Every reply has "ok": true/false; failures carry an "error" message.
+# Many clients can be logged in at once: each login gets its own
+# session token instead of the single current_user of the menu.
+# Password hashing and checking run in a process pool so the event
+# loop never waits on them and concurrent logins use every core.
+# Changes to the store are made one at a time in a writer thread, so
+# saving (and fsync) does not hold up other clients either. The
+# in-memory indexes are only touched on the event loop: searches read
+# them there, so they are updated there once the writer is done.
+# ------------------------------------------------------------
+
+import argparse
+import asyncio
+import dataclasses
+import json
+import multiprocessing
+import os
+import secrets
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from student_passwords import verify_password
+from student_storage import StoreConflictError
+from student_system import StudentError, StudentSystem, hash_password, new_record
+from student_validation import clean_email, clean_id, clean_name
+
+# Default address of the service
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Sessions idle for longer than this many seconds are forgotten
+SESSION_TTL = 30 * 60
+
+# Expired sessions are swept out at most this often (seconds), on login
+PRUNE_INTERVAL = 60
+
+
+class StudentService:
+    """
+    Line-protocol front-end over a StudentSystem.
+    """
+
+    def __init__(self, system, workers=None):
+        self.system = system
+        self.sessions = {}  # token -> [student ID, time of last use]
+        # Forked workers would inherit the sockets of connected clients
+        # and keep them open after we close them, so start fresh ones
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        # One thread, so changes reach the store in write_lock order
+        self.writer = ThreadPoolExecutor(1)
+        self.write_lock = asyncio.Lock()
+        self.next_prune = time.monotonic() + PRUNE_INTERVAL
+
+    async def serve(self, host=HOST, port=PORT):
+        """
+        Accept connections until cancelled.
+        """
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.writer.shutdown()
+        self.executor.shutdown()
+
+    async def handle_connection(self, reader, writer):
+        """
+        Answer requests from one client until it disconnects.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self.handle_line(line)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def handle_line(self, line):
+        """
+        Decode one request, run it and build the reply.
+        """
+        try:
+            request = json.loads(line)
+            handler = self.OPERATIONS[request["op"]]
+        except (ValueError, KeyError, TypeError):
+            return {"ok": False, "error": "Bad request."}
+        try:
+            # Pick up changes other processes (such as a terminal) saved,
+            # unless our own writer is in the middle of saving
+            if not self.write_lock.locked():
+                self.system.refresh()
+            with self.system.metrics.timer("service_" + request["op"]):
+                result = await handler(self, request)
+        except (StudentError, StoreConflictError) as e:
+            return {"ok": False, "error": str(e)}
+        except (KeyError, TypeError, AttributeError, ValueError):
+            return {"ok": False, "error": "Bad request."}
+        return dict(result, ok=True)
+
+    async def hash(self, password):
+        """
+        Hash a password in the worker pool.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, hash_password, password)
+
+    async def verify(self, password, password_hash):
+        """
+        Check a password in the worker pool.
+        Returns (ok, needs_rehash) like verify_password().
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, verify_password, password, password_hash)
+
+    async def write(self, function, *args):
+        """
+        Run a change to the store in the writer thread.
+        The caller holds write_lock, and updates the indexes itself
+        afterwards, on the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.writer, function, *args)
+
+    # --- Operations --------------------------------------------
+
+    async def register(self, request):
+        name = clean_name(request["name"])
+        student_id = clean_id(request["student_id"])
+        email = clean_email(request["email"])
+        password = request["password"]
+        self.system.check_registration(name, student_id, email, password)
+        password_hash = await self.hash(password)
+        async with self.write_lock:
+            # Another client may have taken the ID while we were hashing
+            self.system.check_registration(name, student_id, email, password)
+            record = new_record(name, email, password_hash)
+            await self.write(self.system.store_record, student_id, record)
+            self.system.index_record(student_id, record)
+        return {"student_id": student_id}
+
+    async def login(self, request):
+        student_id = self.system.resolve_login(request.get("student_id") or request["email"])
+        user = self.system.get_record(student_id)
+        ok, stale = await self.verify(request["password"], user["password_hash"])
+        if not ok:
+            raise StudentError("Incorrect password.")
+        new_hash = await self.hash(request["password"]) if stale else None
+        async with self.write_lock:
+            await self.write(self.system.save_login, student_id, new_hash)
+            self.system.index_login(student_id)
+        now = time.monotonic()
+        if now >= self.next_prune:
+            self.prune_sessions(now)
+        token = secrets.token_urlsafe(16)
+        self.sessions[token] = [student_id, now]
+        return {"token": token, "name": user["name"]}
+
+    async def search(self, request):
+        query = request["query"].strip().lower()
+        if not query:
+            raise StudentError("Search term cannot be empty.")
+        page = self.system.find_students(query, limit=int(request.get("limit", 20)),
+                                         offset=int(request.get("offset", 0)))
+        return {"total": page.total,
+                "results": [{"student_id": student.student_id, "name": student.name, "email": student.email}
+                            for student in page.students]}
+
+    async def profile(self, request):
+        student_id = self.session(request)
+        return dataclasses.asdict(self.system.get_student(student_id))
+
+    async def logout(self, request):
+        self.session(request)
+        del self.sessions[request["token"]]
+        return {}
+
+    OPERATIONS = {
+        "register": register,
+        "login": login,
+        "search": search,
+        "profile": profile,
+        "logout": logout,
+    }
+
+    # --- Sessions ----------------------------------------------
+
+    def session(self, request):
+        """
+        Return the student ID of the session named by request["token"].
+        Raises StudentError if the token is unknown or has expired.
+        """
+        now = time.monotonic()
+        session = self.sessions.get(request.get("token"))
+        if session is None or now - session[1] > SESSION_TTL:
+            self.sessions.pop(request.get("token"), None)
+            raise StudentError("You must be logged in.")
+        session[1] = now
+        return session[0]
+
+    def prune_sessions(self, now):
+        """
+        Forget every session idle for longer than SESSION_TTL, so tokens
+        that are never used again do not pile up.
+        """
+        self.sessions = {token: session for token, session in self.sessions.items()
+                         if now - session[1] <= SESSION_TTL}
+        self.next_prune = now + PRUNE_INTERVAL
+
+
+def serve(system, host=HOST, port=PORT, workers=None):
+    """
+    Run the service in the foreground until interrupted.
+    """
+    service = StudentService(system, workers)
+    print(f"Serving student system on {host}:{port} (Ctrl+C to stop)")
+    try:
+        asyncio.run(service.serve(host, port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+# --- Load test ------------------------------------------------
+
+async def call(reader, writer, request):
+    writer.write(json.dumps(request).encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+async def run_client(host, port, client, requests, latencies):
+    """
+    One simulated user: register, then alternate logins, profile views
+    and searches, timing every request.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    student_id = f"LOAD{os.getpid()}X{client}"
+    password = "loadtest-password"
+    await call(reader, writer, {"op": "register", "name": f"Load Tester {client}",
+                                "student_id": student_id, "email": f"load{client}@example.com",
+                                "password": password})
+    token = None
+    for i in range(requests):
+        if i % 3 == 0 or token is None:
+            request = {"op": "login", "student_id": student_id, "password": password}
+        elif i % 3 == 1:
+            request = {"op": "profile", "token": token}
+        else:
+            request = {"op": "search", "query": "load tester", "limit": 10}
+        start = time.perf_counter()
+        reply = await call(reader, writer, request)
+        latencies.append(time.perf_counter() - start)
+        if request["op"] == "login" and reply["ok"]:
+            token = reply["token"]
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(host, port, clients, requests):
+    """
+    Run clients concurrent users against a running service.
+    Returns a dictionary with throughput and latency percentiles.
+    """
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(run_client(host, port, client, requests, latencies)
+                           for client in range(clients)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    cuts = statistics.quantiles(latencies, n=100)
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+    }
+
+
+async def spawned_load_test(clients, requests, port):
+    """
+    Start a service on a throwaway data file and load-test it.
+    """
+    directory = tempfile.mkdtemp()
+    system = StudentSystem(os.path.join(directory, "students.json"))
+    service = StudentService(system)
+    server = await asyncio.start_server(service.handle_connection, HOST, port)
+    try:
+        return await load_test(HOST, port, clients, requests)
+    finally:
+        server.close()
+        await server.wait_closed()
+        service.close()
+        system.close()
+        shutil.rmtree(directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Student service tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    load = commands.add_parser("loadtest", help="measure requests/sec and latency")
+    load.add_argument("--host", default=HOST)
+    load.add_argument("--port", type=int, default=PORT)
+    load.add_argument("--clients", type=int, default=50)
+    load.add_argument("--requests", type=int, default=100, help="requests per client")
+    load.add_argument("--spawn", action="store_true",
+                      help="start a throwaway service instead of using a running one")
+
+    args = parser.parse_args(argv)
+    if args.spawn:
+        results = asyncio.run(spawned_load_test(args.clients, args.requests, args.port))
+    else:
+        results = asyncio.run(load_test(args.host, args.port, args.clients, args.requests))
+    for key, value in results.items():
+        print(f"{key:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+# ------------------------------------------------------------
+# Binary Snapshots for the Student Registration and Login System
+# ------------------------------------------------------------
+# A compact alternative to the pretty-printed students.json layout,
+# chosen with STUDENT_SNAPSHOT=binary (see student_storage.py). Files
+# are recognised by their first bytes, so either format loads whatever
+# the setting, and JSON stays available through export.
+# Layout (little-endian):
+#   - header: magic, format version, flags (0), record count, CRC-32
+#     of the header fields
+#   - one frame per student: payload length, CRC-32 of the payload,
+#     then the payload: a fixed part (field lengths and kinds,
+#     timestamps, login count), a raw password hash if there is one,
+#     and one UTF-8 text holding the student ID, name, email, a text
+#     password hash and any text timestamps (lengths in characters, so
+#     the text is decoded once per record)
+# SHA-256 hex hashes are stored as 32 raw bytes and timestamps as
+# integer epoch seconds, as in StudentRecord; anything else (KDF
+# hashes, odd timestamps) is kept as text.
+# ------------------------------------------------------------
+
+import struct
+import time
+import zlib
+
+from student_records import StudentRecord, pack_hash, pack_time
+
+MAGIC = b"STUSNAP\x00"
+VERSION = 1
+
+# magic, version, flags, record count; followed by CHECKSUM of these
+HEADER = struct.Struct("<8sHHQ")
+CHECKSUM = struct.Struct("<I")
+HEADER_SIZE = HEADER.size + CHECKSUM.size
+
+# payload length, CRC-32 of the payload
+FRAME = struct.Struct("<II")
+
+# ID, name, email and hash lengths (characters, or bytes for a raw
+# hash); hash, registered_on and last_login kinds; registered_on,
+# last_login, login_count
+RECORD = struct.Struct("<IIIIBBBqqq")
+
+# Password hash kinds
+HASH_RAW = 0   # 32 raw bytes of a SHA-256 hex digest
+HASH_TEXT = 1  # any other hash, as UTF-8
+
+# Timestamp kinds (the value is the epoch seconds, or the text length)
+TIME_NONE = 0
+TIME_EPOCH = 1
+TIME_TEXT = 2
+
+# Frames written to the file at once
+WRITE_BATCH = 4096
+
+
+class SnapshotError(ValueError):
+    """
+    Raised when a binary snapshot is damaged or from a newer version.
+    """
+
+
+def is_binary(prefix):
+    """
+    True if the first bytes of a file mark it as a binary snapshot.
+    """
+    return prefix[:len(MAGIC)] == MAGIC
+
+
+def _time_field(value, texts):
+    if value is None:
+        return TIME_NONE, 0
+    if isinstance(value, int):
+        return TIME_EPOCH, value
+    texts.append(value)
+    return TIME_TEXT, len(value)
+
+
+def time_formatter():
+    """
+    Return a function that formats epoch seconds like unpack_time(),
+    remembering each date and time of day it has formatted (a roster
+    has far fewer of either than it has timestamps). Meant for one
+    read, so the caches go away with it.
+    """
+    dates = {}
+    clocks = {}
+
+    def format_time(value):
+        day, rest = divmod(value, 86400)
+        date = dates.get(day)
+        if date is None:
+            date = dates[day] = time.strftime("%Y-%m-%d ", time.gmtime(day * 86400))
+        clock = clocks.get(rest)
+        if clock is None:
+            clock = clocks[rest] = "%02d:%02d:%02d" % (rest // 3600, rest // 60 % 60, rest % 60)
+        return date + clock
+
+    return format_time
+
+
+def encode_record(student_id, record):
+    """
+    Return the frame (header and payload) for one student record.
+    """
+    if isinstance(record, StudentRecord):
+        name, email, packed_hash, registered, login_count, last_login = record.packed()
+    else:
+        name, email = record["name"], record["email"]
+        packed_hash = pack_hash(record["password_hash"])
+        registered = pack_time(record["registered_on"])
+        login_count = record["login_count"]
+        last_login = pack_time(record["last_login"])
+    texts = [student_id, name, email]
+    if isinstance(packed_hash, bytes):
+        hash_kind, raw_hash = HASH_RAW, packed_hash
+    else:
+        hash_kind, raw_hash = HASH_TEXT, b""
+        texts.append(packed_hash)
+    registered_kind, registered = _time_field(registered, texts)
+    last_kind, last_login = _time_field(last_login, texts)
+    payload = (RECORD.pack(len(student_id), len(name), len(email), len(packed_hash),
+                           hash_kind, registered_kind, last_kind, registered, last_login,
+                           login_count)
+               + raw_hash + "".join(texts).encode())
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def write_binary(f, records):
+    """
+    Write records (a mapping of student ID -> record) to a file opened
+    in binary mode.
+    """
+    header = HEADER.pack(MAGIC, VERSION, 0, len(records))
+    f.write(header + CHECKSUM.pack(zlib.crc32(header)))
+    frames = []
+    for student_id, record in records.items():
+        frames.append(encode_record(student_id, record))
+        if len(frames) == WRITE_BATCH:
+            f.write(b"".join(frames))
+            frames = []
+    f.write(b"".join(frames))
+
+
+def read_binary(data, compact=False):
+    """
+    Decode a whole binary snapshot (bytes).
+    Returns a dictionary of records: dicts in the students.json schema,
+    or StudentRecord objects with compact=True.
+    Raises SnapshotError if a checksum does not match, the data is cut
+    short, or the version is newer than this code understands.
+    """
+    if len(data) < HEADER_SIZE or not is_binary(data):
+        raise SnapshotError("not a binary snapshot")
+    magic, version, flags, count = HEADER.unpack_from(data)
+    if CHECKSUM.unpack_from(data, HEADER.size)[0] != zlib.crc32(data[:HEADER.size]):
+        raise SnapshotError("header checksum mismatch")
+    if version > VERSION:
+        raise SnapshotError(f"snapshot version {version} is newer than this program ({VERSION})")
+
+    view = memoryview(data)
+    size = len(data)
+    unpack_frame = FRAME.unpack_from
+    unpack_record = RECORD.unpack_from
+    crc32 = zlib.crc32
+    format_time = time_formatter()
+    records = {}
+    position = HEADER_SIZE
+    for number in range(count):
+        if position + FRAME.size > size:
+            raise SnapshotError(f"cut short after {number} of {count} records")
+        length, checksum = unpack_frame(data, position)
+        start = position + FRAME.size
+        position = start + length
+        if position > size:
+            raise SnapshotError(f"cut short after {number} of {count} records")
+        if crc32(view[start:position]) != checksum:
+            raise SnapshotError(f"checksum mismatch in record {number + 1}")
+
+        (id_length, name_length, email_length, hash_length, hash_kind, registered_kind,
+         last_kind, registered, last_login, login_count) = unpack_record(data, start)
+        at = start + RECORD.size
+        if hash_kind == HASH_RAW:
+            packed_hash = data[at:at + hash_length]
+            at += hash_length
+        text = data[at:position].decode()
+        at = id_length + name_length
+        student_id, name = text[:id_length], text[id_length:at]
+        email = text[at:at + email_length]
+        at += email_length
+        if hash_kind == HASH_TEXT:
+            packed_hash, at = text[at:at + hash_length], at + hash_length
+        if registered_kind == TIME_TEXT:
+            registered, at = text[at:at + registered], at + registered
+        elif registered_kind == TIME_NONE:
+            registered = None
+        if last_kind == TIME_TEXT:
+            last_login = text[at:at + last_login]
+        elif last_kind == TIME_NONE:
+            last_login = None
+
+        if compact:
+            records[student_id] = StudentRecord.from_packed(name, email, packed_hash, registered,
+                                                            login_count, last_login)
+        else:
+            records[student_id] = {
+                "name": name,
+                "email": email,
+                "password_hash": packed_hash.hex() if hash_kind == HASH_RAW else packed_hash,
+                "registered_on": format_time(registered) if registered_kind == TIME_EPOCH else registered,
+                "login_count": login_count,
+                "last_login": format_time(last_login) if last_kind == TIME_EPOCH else last_login,
+            }
+    if position != size:
+        raise SnapshotError(f"{size - position} unexpected bytes after the last record")
+    return records
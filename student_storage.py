@@ -0,0 +1,1479 @@
+# ------------------------------------------------------------
+# Storage Engines for the Student Registration and Login System
+# ------------------------------------------------------------
+# Engines:
+#   - json:    the original students.json layout, rewritten in full
+#              after every change
+#   - journal: students.json snapshot plus an append-only journal of
+#              record-level changes, compacted in the background
+#   - sqlite:  records kept in students.db with indexed lookups,
+#              migrated once from students.json
+#   - lazy:    students.json memory-mapped with an on-disk offset
+#              index; records are decoded only when used, changes go
+#              to a journal
+#   - sharded: records split by a hash of the student ID over N
+#              students.json style files (students.json.shards/),
+#              read in parallel; a change rewrites only its own shard
+# Every engine behaves like a dictionary of student records keyed by
+# student ID. Assigning or deleting a key persists the change; use
+# patch() to change a few fields of an existing record, and batch() to
+# group several changes into one write. Stores track which records are
+# dirty and can coalesce bursts of changes into one flush (see
+# BufferedStore).
+# Snapshots (students.json and the shard files) are written as
+# pretty-printed JSON, or with snapshot_format="binary" in the compact
+# format of student_snapshot.py; either is recognised when read. The
+# lazy engine needs JSON.
+# Several processes may share one students.json (json engine): writers
+# take an advisory lock (<path>.lock), replace the file atomically and
+# merge in changes other processes made since they last read it; the
+# sharded engine does the same shard by shard. The journal and lazy
+# engines allow one process at a time.
+# ------------------------------------------------------------
+
+import json
+import mmap
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+from student_records import FIELDS, StudentRecord, compact_hook
+from student_snapshot import MAGIC, SnapshotError, is_binary, read_binary, write_binary
+
+# Advisory locks need fcntl (POSIX); elsewhere writes are still atomic
+# but processes do not wait for each other
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Seconds to wait for another process to release the data file
+LOCK_TIMEOUT = 10
+
+# Snapshot formats accepted by write_snapshot() and the stores
+SNAPSHOT_FORMATS = ("json", "binary")
+
+
+class StoreFormatError(ValueError):
+    """
+    Raised when a data file exists but does not hold a dictionary
+    of student records. path names the file (or shard directory) that
+    could not be read, when it is not the data file itself.
+    """
+
+    def __init__(self, message, path=None):
+        super().__init__(message)
+        self.path = path
+
+
+class StoreLockedError(RuntimeError):
+    """
+    Raised when another process holds the data file for too long, or
+    owns it outright (journal and lazy engines).
+    """
+
+
+class StoreConflictError(RuntimeError):
+    """
+    Raised by a flush when another process changed the same students
+    in incompatible ways. Their version was kept; ours was dropped.
+    """
+
+    def __init__(self, student_ids):
+        self.student_ids = sorted(student_ids)
+        super().__init__("Another session changed the same record at the same time "
+                         f"({', '.join(self.student_ids)}); your change was not saved.")
+
+
+class FileLock:
+    """
+    Advisory inter-process lock on a separate lock file (the data file
+    itself is replaced on every write, so it cannot carry the lock).
+    Shared holders may overlap; an exclusive holder excludes everyone.
+    """
+
+    def __init__(self, path, timeout=LOCK_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._file = None
+        self._depth = 0
+
+    def acquire(self, exclusive=True, timeout=None):
+        """
+        Take the lock, waiting up to timeout seconds (default: self.timeout).
+        Re-entrant: nested acquires only count. Raises StoreLockedError.
+        """
+        if self._depth:
+            self._depth += 1
+            return
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            mode = (fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH) | fcntl.LOCK_NB
+            deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+            while True:
+                try:
+                    fcntl.flock(self._file, mode)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        self._file.close()
+                        self._file = None
+                        raise StoreLockedError(f"{self.path} is locked by another process")
+                    time.sleep(0.01)
+        self._depth = 1
+
+    @property
+    def held(self):
+        return self._depth > 0
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            # Closing the file drops the flock
+            self._file.close()
+            self._file = None
+
+    @contextmanager
+    def shared(self):
+        self.acquire(exclusive=False)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextmanager
+    def exclusive(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+def file_signature(path):
+    """
+    Identify the current version of a file that is only ever replaced
+    (never rewritten in place). None if it does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def merge_record(base, mine, theirs):
+    """
+    Three-way merge of one student record.
+    base is the record as we last read it, mine is ours now, theirs is
+    what another process saved; None means "no such student".
+    Returns (record, ok). Logins made by both sides are added together
+    and the later last_login wins; any other field changed differently
+    on both sides is a conflict, and then theirs is returned with ok False.
+    """
+    if theirs == base:
+        return mine, True
+    if mine == base:
+        return theirs, True
+    if base is None or mine is None or theirs is None:
+        return theirs, mine == theirs
+    merged = dict(theirs)
+    for field in FIELDS:
+        if field == "login_count":
+            # Checked first: equal counts on both sides are still two
+            # sets of logins
+            merged[field] = theirs[field] + mine[field] - base[field]
+            continue
+        if mine[field] == base[field] or mine[field] == theirs[field]:
+            continue
+        if theirs[field] == base[field]:
+            merged[field] = mine[field]
+        elif field == "last_login" and mine[field] and theirs[field]:
+            merged[field] = max(mine[field], theirs[field])
+        else:
+            return theirs, False
+    return merged, True
+
+
+def read_snapshot(path, compact=False):
+    """
+    Read a snapshot in either format (JSON or binary, told apart by
+    the first bytes).
+    Returns a dictionary of records (empty if the file is missing).
+    With compact=True the records are StudentRecord objects.
+    Raises StoreFormatError if the top-level value is not a dictionary
+    or a binary snapshot is damaged.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'rb') as f:
+        binary = is_binary(f.read(len(MAGIC)))
+        f.seek(0)
+        if binary:
+            try:
+                return read_binary(f.read(), compact)
+            except SnapshotError as e:
+                raise StoreFormatError(f"{path}: {e}") from e
+        try:
+            data = json.load(f, object_hook=compact_hook if compact else None)
+        except UnicodeDecodeError as e:
+            raise StoreFormatError(f"{path} is neither JSON nor a binary snapshot") from e
+    if not isinstance(data, dict):
+        raise StoreFormatError(f"{path} does not contain a dictionary")
+    return data
+
+
+def dump_records(records, f, offsets=None):
+    """
+    Write records to an open file exactly as json.dump(records, f, indent=4)
+    would, one record at a time, so records may be any mapping type and
+    no second copy of the roster is built in memory.
+    If offsets is a list, (student_id, offset, length) is appended to it
+    for each record's JSON value (the output is ASCII, so these are byte
+    positions).
+    """
+    if not records:
+        f.write("{}")
+        return
+    separator = "{\n    "
+    position = 0
+    for student_id, record in records.items():
+        head = separator + json.dumps(student_id) + ": "
+        value = json.dumps(dict(record), indent=4).replace("\n", "\n    ")
+        f.write(head)
+        f.write(value)
+        if offsets is not None:
+            offsets.append((student_id, position + len(head), len(value)))
+            position += len(head) + len(value)
+        separator = ",\n    "
+    f.write("\n}")
+
+
+def write_snapshot(path, records, offsets=None, snapshot_format="json"):
+    """
+    Write records to path in the students.json layout, or in the binary
+    layout with snapshot_format="binary".
+    The data goes to a temporary file first and is moved into place
+    with os.replace, so readers never see a half-written snapshot.
+    offsets is passed on to dump_records() (JSON only).
+    Returns the number of bytes written.
+    """
+    tmp_path = path + ".tmp"
+    if snapshot_format == "binary":
+        if offsets is not None:
+            raise ValueError("Record offsets are only available for JSON snapshots")
+        with open(tmp_path, 'wb') as f:
+            write_binary(f, records)
+            f.flush()
+            os.fsync(f.fileno())
+            size = os.fstat(f.fileno()).st_size
+        os.replace(tmp_path, path)
+        return size
+    with open(tmp_path, 'w') as f:
+        dump_records(records, f, offsets)
+        f.flush()
+        os.fsync(f.fileno())
+        size = os.fstat(f.fileno()).st_size
+    os.replace(tmp_path, path)
+    return size
+
+
+class BufferedStore(MutableMapping):
+    """
+    Base class for stores that coalesce writes.
+
+    Changed records are tracked as dirty and written together by
+    flush(). A flush happens automatically once flush_every changes are
+    pending, or flush_interval seconds after the first pending change,
+    whichever comes first. The defaults (1 change, no interval) write
+    every change straight away. Inside batch() nothing is flushed until
+    the outermost batch ends. Using the store as a context manager
+    closes it (flushing first) on exit.
+    """
+
+    def __init__(self, flush_every=1, flush_interval=0):
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._dirty = {}  # student ID -> set of changed fields, or None for the whole record
+        self._changes = 0
+        self._batch_depth = 0
+        self._timer = None
+        # Bumped whenever changes made by another process are picked up,
+        # so callers know to rebuild anything derived from the records
+        self.external_changes = 0
+        # Bytes written to data/journal files (SQLite does its own I/O
+        # and does not count)
+        self.bytes_written = 0
+
+    def flush(self):
+        """
+        Write all pending changes to disk now.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                dirty = self._dirty
+                self._dirty = {}
+                self._changes = 0
+                self._write(dirty)
+
+    @contextmanager
+    def batch(self):
+        """
+        Group several changes so they are written to disk together.
+        Batches may be nested; the write happens when the outermost ends.
+        """
+        with self._lock:
+            if self._batch_depth == 0:
+                self._begin_batch()
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self._abort_batch()
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def close(self):
+        """
+        Flush pending changes and release any resources held by the store.
+        """
+        self.flush()
+
+    def refresh(self):
+        """
+        Pick up changes other processes have saved since the last read.
+        Stores that always read from disk have nothing to do.
+        """
+
+    def signature(self):
+        """
+        Identify the version of the data on disk that the records seen
+        through this store reflect, for caches saved next to it (see
+        LookupIndex). Only meaningful once pending changes are flushed.
+        """
+        raise NotImplementedError
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --- Dirty tracking ----------------------------------------
+
+    def _mark(self, student_id, fields=None):
+        """
+        Record that a student changed (only the given fields, if any)
+        and flush if the coalescing window is full.
+        Called with the lock held.
+        """
+        if fields is None:
+            self._dirty[student_id] = None
+        else:
+            changed = self._dirty.setdefault(student_id, set())
+            if changed is not None:
+                changed.update(fields)
+        self._changes += 1
+        if self._batch_depth:
+            return
+        if self._changes >= self.flush_every:
+            self.flush()
+        elif self.flush_interval and self._timer is None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _begin_batch(self):
+        pass
+
+    def _abort_batch(self):
+        self.flush()
+
+    def _write(self, dirty):
+        raise NotImplementedError
+
+
+class JsonStore(BufferedStore):
+    """
+    The original storage layout: one JSON file holding every record.
+    Each flush rewrites the whole file.
+    With compact=True records are held in memory as StudentRecord
+    objects instead of dicts (see student_records.py).
+
+    Safe to share between processes: reads take a shared lock, each
+    flush takes the exclusive lock, writes a temporary file and moves it
+    into place. If the file changed since we read it, the other
+    process's version is merged with ours record by record first (see
+    merge_record); changes that cannot be merged are dropped and
+    reported with StoreConflictError.
+    snapshot_format ("json" or "binary") is the format files are
+    written in; files in either format are read.
+    """
+
+    def __init__(self, path, compact=False, snapshot_format="json", **options):
+        if snapshot_format not in SNAPSHOT_FORMATS:
+            raise ValueError(f"Unknown snapshot format '{snapshot_format}'. "
+                             f"Choose from: {', '.join(SNAPSHOT_FORMATS)}")
+        super().__init__(**options)
+        self.path = path
+        self.compact = compact
+        self.snapshot_format = snapshot_format
+        self.lock = FileLock(path + ".lock")
+        self._records = {}
+        self._signature = None  # file_signature() of the version we read
+        self._base = {}         # student ID -> record as read, for changed students
+
+    def signature(self):
+        # The version last read or written: other processes may have
+        # replaced the file since, but we have not seen their records
+        return [self._signature]
+
+    def load(self):
+        """
+        Read all records from disk.
+        Returns the store itself so calls can be chained.
+        """
+        with self.lock.shared():
+            self._signature = file_signature(self.path)
+            self._records = self._read_snapshot()
+        return self
+
+    def refresh(self):
+        """
+        Re-read the file if another process has replaced it.
+        Skipped while changes are pending; the next flush merges instead.
+        """
+        with self._lock:
+            if self._base or file_signature(self.path) == self._signature:
+                return
+            with self.lock.shared():
+                self._signature = file_signature(self.path)
+                self._records = self._read_snapshot()
+            self.external_changes += 1
+
+    def save(self):
+        """
+        Write every record to disk.
+        """
+        with self._lock:
+            self._dirty = {}
+            self._changes = 0
+            self._save_all()
+
+    def patch(self, student_id, fields):
+        """
+        Update some fields of an existing record in place and persist it.
+        """
+        with self._lock:
+            self._remember(student_id)
+            self._records[student_id].update(fields)
+            self._mark(student_id, fields)
+
+    # --- Mapping interface -------------------------------------
+
+    def __getitem__(self, student_id):
+        return self._records[student_id]
+
+    def __setitem__(self, student_id, record):
+        with self._lock:
+            self._remember(student_id)
+            self._records[student_id] = self._make(record)
+            self._mark(student_id)
+
+    def __delitem__(self, student_id):
+        with self._lock:
+            self._remember(student_id)
+            del self._records[student_id]
+            self._mark(student_id)
+
+    def __contains__(self, student_id):
+        return student_id in self._records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+    def items(self):
+        return self._records.items()
+
+    # --- Persistence -------------------------------------------
+
+    def _read_snapshot(self):
+        return read_snapshot(self.path, self.compact)
+
+    def _make(self, record):
+        """
+        Convert a record to the in-memory layout used by this store.
+        """
+        if self.compact and not isinstance(record, StudentRecord):
+            return StudentRecord.from_mapping(record)
+        return record
+
+    def _copy(self, record):
+        return record.copy() if isinstance(record, (dict, StudentRecord)) else dict(record)
+
+    def _save_all(self):
+        conflicts = []
+        with self.lock.exclusive():
+            if file_signature(self.path) != self._signature:
+                conflicts = self._merge_from_disk()
+            self.bytes_written += write_snapshot(self.path, self._records,
+                                                 snapshot_format=self.snapshot_format)
+            self._signature = file_signature(self.path)
+            self._base = {}
+        if conflicts:
+            raise StoreConflictError(conflicts)
+
+    def _write(self, dirty):
+        self._save_all()
+
+    # --- Sharing with other processes --------------------------
+
+    def _remember(self, student_id):
+        """
+        Keep the record as it was before our first change to it, so a
+        concurrent change by another process can be merged.
+        """
+        if student_id not in self._base:
+            record = self._records.get(student_id)
+            self._base[student_id] = None if record is None else dict(record)
+
+    def _merge_from_disk(self):
+        """
+        Replace our records with the file another process saved, keeping
+        each of our changes that merges cleanly.
+        Returns the IDs of the changes that had to be dropped.
+        """
+        records = self._read_snapshot()
+        conflicts = []
+        for student_id, base in self._base.items():
+            mine = self._records.get(student_id)
+            theirs = records.get(student_id)
+            merged, ok = merge_record(base, None if mine is None else dict(mine),
+                                      None if theirs is None else dict(theirs))
+            if merged is None:
+                records.pop(student_id, None)
+            else:
+                records[student_id] = self._make(merged)
+            if not ok:
+                conflicts.append(student_id)
+        self._records = records
+        self.external_changes += 1
+        return conflicts
+
+
+class JournalStore(JsonStore):
+    """
+    students.json snapshot plus an append-only journal.
+
+    Each flush appends one JSON line per dirty record to <path>.journal
+    (a login only writes the two fields it changed), so the cost of a
+    change depends on the size of the change, not on the number of
+    students. Once the journal holds compact_after entries it is
+    rotated to <path>.journal.old and a background thread writes a new
+    snapshot. Replaying a journal entry twice gives the same result, so
+    a crash at any point during compaction loses nothing.
+    """
+
+    def __init__(self, path, compact_after=1000, sync=True, **options):
+        super().__init__(path, **options)
+        self.journal_path = path + ".journal"
+        self.rotated_path = self.journal_path + ".old"
+        self.compact_after = compact_after
+        self.sync = sync
+        self._journal = None
+        self._entries = 0
+        self._compactor = None
+
+    def signature(self):
+        # Only this process writes while the store is open
+        return [file_signature(path) for path in (self.path, self.journal_path, self.rotated_path)]
+
+    def load(self):
+        """
+        Read the snapshot and replay any journal entries written after it.
+        A journal left behind by an interrupted compaction is folded into
+        a fresh snapshot before the store is used.
+        The store keeps the data file's lock until it is closed: other
+        processes cannot see journaled changes, so only one may use it.
+        Raises StoreLockedError if another process has it open.
+        """
+        self.lock.acquire(timeout=0)
+        self._signature = file_signature(self.path)
+        self._records = self._read_snapshot()
+        interrupted = os.path.exists(self.rotated_path)
+        if interrupted:
+            self._replay(self.rotated_path)
+        self._entries = self._replay(self.journal_path)
+        if interrupted:
+            self.save()
+        return self
+
+    def save(self):
+        """
+        Write a full snapshot now and empty the journal.
+        """
+        with self._lock:
+            self._wait_for_compaction()
+            self._dirty = {}
+            self._changes = 0
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            self._write_snapshot(self._records)
+            for path in (self.rotated_path, self.journal_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._entries = 0
+
+    def close(self):
+        """
+        Flush pending changes, wait for a running compaction and close
+        the journal.
+        """
+        with self._lock:
+            self.flush()
+            self._wait_for_compaction()
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self.lock.held:
+                self.lock.release()
+
+    def refresh(self):
+        # We hold the data file's lock, so nobody else can have changed
+        # it; re-reading the snapshot would drop the replayed journal
+        pass
+
+    # --- Journal -----------------------------------------------
+
+    def _replay(self, path):
+        """
+        Apply every complete entry of a journal file to the records.
+        A torn final line (from a crash mid-write) is cut off so later
+        appends start on a clean line.
+        Returns the number of entries applied.
+        """
+        if not os.path.exists(path):
+            return 0
+        applied = 0
+        good_size = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._apply(entry)
+                applied += 1
+                good_size += len(line)
+        if good_size < os.path.getsize(path):
+            with open(path, 'r+b') as f:
+                f.truncate(good_size)
+        return applied
+
+    def _remember(self, student_id):
+        # The journal has a single owner; nothing to merge
+        pass
+
+    def _apply(self, entry):
+        op = entry["op"]
+        student_id = entry["id"]
+        if op == "put":
+            self._records[student_id] = self._make(entry["record"])
+        elif op == "patch":
+            if student_id in self._records:
+                self._records[student_id].update(entry["fields"])
+        elif op == "delete":
+            self._records.pop(student_id, None)
+
+    def _entry(self, student_id, fields):
+        """
+        Build the journal entry that brings a dirty record up to date.
+        """
+        record = self._records.get(student_id)
+        if record is None:
+            return {"op": "delete", "id": student_id}
+        if fields is None:
+            return {"op": "put", "id": student_id, "record": dict(record)}
+        return {"op": "patch", "id": student_id, "fields": {name: record[name] for name in fields}}
+
+    def _write(self, dirty):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a')
+        lines = [json.dumps(self._entry(student_id, fields), separators=(',', ':')) + "\n"
+                 for student_id, fields in dirty.items()]
+        data = "".join(lines)
+        self._journal.write(data)
+        self._sync()
+        self.bytes_written += len(data)
+        self._entries += len(lines)
+        if self._entries >= self.compact_after:
+            self._start_compaction()
+
+    def _sync(self):
+        self._journal.flush()
+        if self.sync:
+            os.fsync(self._journal.fileno())
+
+    # --- Compaction --------------------------------------------
+
+    def _start_compaction(self):
+        """
+        Rotate the journal and write a snapshot on a background thread.
+        The records are copied here so the thread never sees them change.
+        """
+        self._wait_for_compaction()
+        records = {sid: self._copy(record) for sid, record in self._records.items()}
+        self._journal.close()
+        os.replace(self.journal_path, self.rotated_path)
+        self._journal = open(self.journal_path, 'a')
+        self._entries = 0
+        self._compactor = threading.Thread(target=self._compact, args=(records,))
+        self._compactor.start()
+
+    def _compact(self, records):
+        self._write_snapshot(records)
+        os.remove(self.rotated_path)
+
+    def _write_snapshot(self, records):
+        self.bytes_written += write_snapshot(self.path, records, snapshot_format=self.snapshot_format)
+        self._signature = file_signature(self.path)
+
+    def _wait_for_compaction(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
+
+
+class SqliteStore(BufferedStore):
+    """
+    Records kept in a SQLite database next to the JSON data file.
+
+    Nothing is read at startup: lookups go through the primary key on
+    student_id and the indexes on the lowercased name and the email.
+    Changes run inside an open transaction that each flush commits;
+    batch() commits once at the end (or rolls back on error).
+    The first time the database is created it is filled from the JSON
+    data file, if there is one.
+    Reads always see other processes' commits; refresh() only counts
+    them in external_changes, for callers' in-memory indexes.
+    """
+
+    # Record fields in column order (student_id and name_lower are extra)
+    FIELDS = ("name", "email", "password_hash", "registered_on", "login_count", "last_login")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            student_id    TEXT PRIMARY KEY,
+            name          TEXT NOT NULL,
+            name_lower    TEXT NOT NULL,
+            email         TEXT NOT NULL,
+            password_hash TEXT NOT NULL,
+            registered_on TEXT,
+            login_count   INTEGER NOT NULL DEFAULT 0,
+            last_login    TEXT
+        );
+        CREATE INDEX IF NOT EXISTS students_name_lower ON students (name_lower);
+        CREATE INDEX IF NOT EXISTS students_email ON students (email);
+    """
+
+    SELECT = "SELECT student_id, name, email, password_hash, registered_on, login_count, last_login FROM students"
+    GET = SELECT + " WHERE student_id = ?"
+    SEARCH = SELECT + " WHERE instr(lower(student_id), ?) > 0 OR instr(name_lower, ?) > 0 ORDER BY rowid"
+    ALL = SELECT + " ORDER BY rowid"
+    EXISTS = "SELECT 1 FROM students WHERE student_id = ?"
+    UPSERT = """
+        INSERT INTO students (student_id, name, name_lower, email, password_hash,
+                              registered_on, login_count, last_login)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (student_id) DO UPDATE SET
+            name = excluded.name, name_lower = excluded.name_lower,
+            email = excluded.email, password_hash = excluded.password_hash,
+            registered_on = excluded.registered_on, login_count = excluded.login_count,
+            last_login = excluded.last_login
+    """
+    DELETE = "DELETE FROM students WHERE student_id = ?"
+
+    def __init__(self, path, db_path=None, compact=False, snapshot_format="json", **options):
+        # compact and snapshot_format are accepted for symmetry; records
+        # already live on disk (the JSON data file is read in either format)
+        super().__init__(**options)
+        self.path = path
+        self.db_path = db_path or os.path.splitext(path)[0] + ".db"
+        self._conn = None
+        self._data_version = None  # PRAGMA data_version at the last refresh
+
+    def signature(self):
+        # Changes not yet checkpointed into the database sit in the WAL
+        wal = file_signature(self.db_path + "-wal")
+        return [file_signature(self.db_path), wal[1] if wal else 0]
+
+    def load(self):
+        """
+        Open the database, creating the schema and migrating the JSON
+        data file on first use.
+        Returns the store itself so calls can be chained.
+        """
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        # user_version marks a database that has already been migrated
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+            if os.path.exists(self.path):
+                self.migrate_from_json(self.path)
+            self._conn.execute("PRAGMA user_version = 1")
+        self._data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return self
+
+    def refresh(self):
+        """
+        Count commits made by other connections since the last refresh.
+        data_version changes with every commit to the database except
+        our own.
+        """
+        with self._lock:
+            version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._data_version:
+                self._data_version = version
+                self.external_changes += 1
+
+    def migrate_from_json(self, json_path):
+        """
+        Copy every record of a students.json file into the database in
+        a single transaction.
+        Returns the number of records copied.
+        """
+        records = read_snapshot(json_path)
+        with self._conn:
+            self._conn.executemany(self.UPSERT, (self._row(sid, rec) for sid, rec in records.items()))
+        return len(records)
+
+    def save(self):
+        """
+        Commit any pending changes.
+        """
+        self.flush()
+
+    def patch(self, student_id, fields):
+        """
+        Update some fields of an existing record.
+        """
+        columns = [name for name in self.FIELDS if name in fields]
+        values = [fields[name] for name in columns]
+        if "name" in fields:
+            columns.append("name_lower")
+            values.append(fields["name"].lower())
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        with self._lock:
+            cursor = self._conn.execute(f"UPDATE students SET {assignments} WHERE student_id = ?",
+                                        values + [student_id])
+            if cursor.rowcount == 0:
+                raise KeyError(student_id)
+            self._mark(student_id, fields)
+
+    def search(self, query):
+        """
+        Find records whose ID or name contains query (already lowercased).
+        Yields (student_id, record) pairs.
+        """
+        for row in self._conn.execute(self.SEARCH, (query, query)).fetchall():
+            yield row[0], self._record(row)
+
+    def close(self):
+        """
+        Commit and close the database connection.
+        """
+        with self._lock:
+            if self._conn is not None:
+                self.flush()
+                self._conn.close()
+                self._conn = None
+
+    # --- Mapping interface -------------------------------------
+
+    def __getitem__(self, student_id):
+        row = self._conn.execute(self.GET, (student_id,)).fetchone()
+        if row is None:
+            raise KeyError(student_id)
+        return self._record(row)
+
+    def __setitem__(self, student_id, record):
+        with self._lock:
+            self._conn.execute(self.UPSERT, self._row(student_id, record))
+            self._mark(student_id)
+
+    def __delitem__(self, student_id):
+        with self._lock:
+            if self._conn.execute(self.DELETE, (student_id,)).rowcount == 0:
+                raise KeyError(student_id)
+            self._mark(student_id)
+
+    def __contains__(self, student_id):
+        return self._conn.execute(self.EXISTS, (student_id,)).fetchone() is not None
+
+    def __iter__(self):
+        for row in self._conn.execute("SELECT student_id FROM students ORDER BY rowid").fetchall():
+            yield row[0]
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def items(self):
+        for row in self._conn.execute(self.ALL):
+            yield row[0], self._record(row)
+
+    # --- Transactions ------------------------------------------
+
+    def _write(self, dirty):
+        self._conn.commit()
+
+    def _begin_batch(self):
+        # Commit earlier changes so a failed batch rolls back only itself
+        self.flush()
+
+    def _abort_batch(self):
+        self._conn.rollback()
+        self._dirty = {}
+        self._changes = 0
+
+    # --- Helpers -----------------------------------------------
+
+    def _row(self, student_id, record):
+        return (student_id, record["name"], record["name"].lower(), record["email"],
+                record["password_hash"], record["registered_on"], record["login_count"],
+                record["last_login"])
+
+    def _record(self, row):
+        return dict(zip(self.FIELDS, row[1:]))
+
+
+# Offset index file: header, then one fixed-width entry per student
+# sorted by encoded student ID (zero-padded to key_width bytes):
+#   header: magic, data file size, data file mtime_ns, count, key_width
+#   entry:  student ID, offset of the record's JSON value, its length
+INDEX_MAGIC = b"SIDX0001"
+INDEX_HEADER = struct.Struct("<8sQQQI4x")
+INDEX_ENTRY = struct.Struct("<QI")
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def scan_offsets(data):
+    """
+    Find every top-level record of a students.json file without
+    building the whole dictionary.
+    data is the file's bytes (or an mmap of them).
+    Yields (student_id, offset, length) for each record's JSON value.
+    Raises StoreFormatError if the file does not hold a dictionary.
+    """
+    # Latin-1 maps every byte to one character, so positions in text are
+    # byte offsets; keys are decoded properly as UTF-8 below
+    text = bytes(data).decode("latin-1")
+    decoder = json.JSONDecoder()
+    position = _WHITESPACE.match(text, 0).end()
+    if text[position:position + 1] != "{":
+        raise StoreFormatError("data file does not contain a dictionary")
+    position = _WHITESPACE.match(text, position + 1).end()
+    if text[position:position + 1] == "}":
+        return
+    while True:
+        if text[position:position + 1] != '"':
+            raise StoreFormatError(f"expected a student ID at byte {position}")
+        key_end = json.decoder.scanstring(text, position + 1)[1]
+        student_id = json.loads(text[position:key_end].encode("latin-1").decode("utf-8"))
+        position = _WHITESPACE.match(text, key_end).end()
+        if text[position:position + 1] != ":":
+            raise StoreFormatError(f"expected ':' at byte {position}")
+        position = _WHITESPACE.match(text, position + 1).end()
+        end = decoder.raw_decode(text, position)[1]
+        yield student_id, position, end - position
+        position = _WHITESPACE.match(text, end).end()
+        separator = text[position:position + 1]
+        position = _WHITESPACE.match(text, position + 1).end()
+        if separator == "}":
+            return
+        if separator != ",":
+            raise StoreFormatError(f"expected ',' or '}}' at byte {position}")
+
+
+def write_index(index_path, data_path, offsets):
+    """
+    Write the offset index for data_path from (student_id, offset, length)
+    triples. A student ID listed twice keeps its last offset, as json.load
+    would.
+    """
+    latest = {student_id.encode(): (offset, length) for student_id, offset, length in offsets}
+    key_width = max(map(len, latest), default=0)
+    stat = os.stat(data_path)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, stat.st_size, stat.st_mtime_ns, len(latest), key_width))
+        for key in sorted(latest):
+            f.write(key.ljust(key_width, b"\0") + INDEX_ENTRY.pack(*latest[key]))
+    os.replace(tmp_path, index_path)
+
+
+class LazyRecords(MutableMapping):
+    """
+    Dictionary view of a memory-mapped students.json.
+
+    Lookups binary-search the offset index (also memory-mapped) and
+    decode just the one record. Records that are read through [] or
+    changed are kept in an overlay, so in-place updates stick; deletions
+    of records still in the file are remembered in a set. Iterating
+    items() decodes records one at a time without keeping them.
+    """
+
+    def __init__(self, data_path, index_path, compact=False):
+        self._hook = compact_hook if compact else None
+        self._overlay = {}     # student ID -> decoded or changed record
+        self._added = {}       # overlay IDs that are not in the file (ordered set)
+        self._deleted = set()  # IDs in the file that have been deleted
+        self._data = self._index = None
+        self._count = self._width = 0
+        if os.path.exists(data_path) and os.path.getsize(data_path):
+            with open(data_path, 'rb') as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            if not self._index_is_current(data_path, index_path):
+                write_index(index_path, data_path, scan_offsets(self._data))
+            with open(index_path, 'rb') as f:
+                self._index = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            _, _, _, self._count, self._width = INDEX_HEADER.unpack_from(self._index)
+        self._entry_size = self._width + INDEX_ENTRY.size
+
+    @staticmethod
+    def _index_is_current(data_path, index_path):
+        """
+        True if index_path exists and was built from data_path as it is now.
+        """
+        try:
+            with open(index_path, 'rb') as f:
+                header = f.read(INDEX_HEADER.size)
+            magic, size, mtime_ns, _, _ = INDEX_HEADER.unpack(header)
+        except (OSError, struct.error):
+            return False
+        stat = os.stat(data_path)
+        return magic == INDEX_MAGIC and size == stat.st_size and mtime_ns == stat.st_mtime_ns
+
+    def close(self):
+        for view in (self._data, self._index):
+            if view is not None:
+                view.close()
+        self._data = self._index = None
+
+    # --- Index lookups -----------------------------------------
+
+    def _key(self, position):
+        start = INDEX_HEADER.size + position * self._entry_size
+        return self._index[start:start + self._width]
+
+    def _find(self, student_id):
+        """
+        Return (offset, length) of a record in the file, or None.
+        """
+        if not self._count:
+            return None
+        key = student_id.encode()
+        if len(key) > self._width:
+            return None
+        key = key.ljust(self._width, b"\0")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self._count or self._key(low) != key:
+            return None
+        return INDEX_ENTRY.unpack_from(self._index, INDEX_HEADER.size + low * self._entry_size + self._width)
+
+    def _decode(self, location):
+        offset, length = location
+        return json.loads(self._data[offset:offset + length], object_hook=self._hook)
+
+    def _file_ids(self):
+        for position in range(self._count):
+            student_id = self._key(position).rstrip(b"\0").decode()
+            if student_id not in self._deleted:
+                yield student_id
+
+    # --- Mapping interface -------------------------------------
+
+    def __getitem__(self, student_id):
+        record = self._overlay.get(student_id)
+        if record is None:
+            location = None if student_id in self._deleted else self._find(student_id)
+            if location is None:
+                raise KeyError(student_id)
+            record = self._overlay[student_id] = self._decode(location)
+        return record
+
+    def __setitem__(self, student_id, record):
+        if student_id not in self._overlay and student_id not in self._deleted \
+                and self._find(student_id) is None:
+            self._added[student_id] = None
+        self._deleted.discard(student_id)
+        self._overlay[student_id] = record
+
+    def __delitem__(self, student_id):
+        if student_id not in self:
+            raise KeyError(student_id)
+        self._overlay.pop(student_id, None)
+        if student_id in self._added:
+            del self._added[student_id]
+        else:
+            self._deleted.add(student_id)
+
+    def __contains__(self, student_id):
+        if student_id in self._overlay:
+            return True
+        return student_id not in self._deleted and self._find(student_id) is not None
+
+    def __iter__(self):
+        yield from self._file_ids()
+        yield from list(self._added)
+
+    def __len__(self):
+        return self._count - len(self._deleted) + len(self._added)
+
+    def items(self):
+        for student_id in self._file_ids():
+            record = self._overlay.get(student_id)
+            yield student_id, record if record is not None else self._decode(self._find(student_id))
+        for student_id in list(self._added):
+            yield student_id, self._overlay[student_id]
+
+
+class LazyStore(JournalStore):
+    """
+    students.json opened lazily, for rosters too big to load at startup.
+
+    The data file is memory-mapped and an offset index (<path>.idx) is
+    built once, or reused while the data file is unchanged, so opening
+    the store takes about the same time and memory for any roster size.
+    A record is decoded only when it is looked up. Changes are journaled
+    as in JournalStore; compaction writes the new snapshot and its index
+    in one pass, in the foreground, because a background copy would
+    have to decode the whole roster.
+    Offsets only exist in JSON, so snapshots are always written as JSON;
+    a binary data file is converted the first time it is opened.
+    """
+
+    def __init__(self, path, snapshot_format="json", **options):
+        if snapshot_format != "json":
+            raise ValueError("The lazy engine only works with JSON snapshots")
+        super().__init__(path, **options)
+        self.index_path = path + ".idx"
+
+    def close(self):
+        """
+        Flush pending changes, close the journal and unmap the data file.
+        """
+        with self._lock:
+            super().close()
+            if isinstance(self._records, LazyRecords):
+                self._records.close()
+
+    def _read_snapshot(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                binary = is_binary(f.read(len(MAGIC)))
+            if binary:
+                self._write_snapshot(read_snapshot(self.path, self.compact))
+                return self._records
+        return LazyRecords(self.path, self.index_path, self.compact)
+
+    def _write_snapshot(self, records):
+        offsets = []
+        self.bytes_written += write_snapshot(self.path, records, offsets)
+        self._signature = file_signature(self.path)
+        write_index(self.index_path, self.path, offsets)
+        if isinstance(self._records, LazyRecords):
+            self._records.close()
+        # Start again from the new file: nothing is decoded or pending
+        self._records = self._read_snapshot()
+
+    def _start_compaction(self):
+        self.save()
+
+
+# Sharded layout: <path>.shards/ holds a manifest and one
+# students.json style file per shard
+SHARD_MANIFEST = "shards.json"
+SHARD_VERSION = 1
+DEFAULT_SHARDS = 16
+
+
+def shard_of(student_id, shards):
+    """
+    Return the number of the shard a student belongs to: the CRC-32 of
+    the ID modulo the number of shards (the same in every process,
+    unlike hash()).
+    """
+    return zlib.crc32(student_id.encode()) % shards
+
+
+def load_shard(path, compact=False):
+    """
+    Read one shard under its shared lock.
+    Returns (file signature, records). A plain function so worker
+    processes can run it.
+    """
+    store = JsonStore(path, compact=compact).load()
+    return store._signature, store._records
+
+
+class ShardedStore(MutableMapping):
+    """
+    Records partitioned over N shards by shard_of(student_id), each a
+    students.json style file under <path>.shards/ kept by its own
+    JsonStore.
+
+    load() reads the shards in parallel worker processes, so startup
+    time falls with the number of cores. A change goes to its own shard
+    only: that shard is locked (in this process and on disk) and
+    rewritten, so a write costs about roster size / N and changes to
+    different shards do not wait for each other. Write coalescing
+    options apply to each shard separately. Other processes may share
+    the shards as they share students.json with the json engine.
+
+    The shard directory is created on first load, from the JSON data
+    file if there is one; the number of shards is then fixed and kept
+    in its manifest (the shards option only applies to a new directory).
+    """
+
+    def __init__(self, path, shards=DEFAULT_SHARDS, workers=None, compact=False, **options):
+        self.path = path
+        self.directory = path + ".shards"
+        self.manifest_path = os.path.join(self.directory, SHARD_MANIFEST)
+        self.compact = compact
+        self.workers = workers or os.cpu_count() or 1
+        self.shards = []
+        self._count = shards
+        self._options = options
+
+    @property
+    def external_changes(self):
+        return sum(shard.external_changes for shard in self.shards)
+
+    @property
+    def bytes_written(self):
+        return sum(shard.bytes_written for shard in self.shards)
+
+    def load(self):
+        """
+        Read every shard, splitting the JSON data file into shards first
+        if the shard directory does not exist yet.
+        Returns the store itself so calls can be chained.
+        Raises StoreFormatError, with the path of the manifest's
+        directory or of the shard that could not be read, if any is
+        damaged; the store must not be used then.
+        """
+        count = self._read_manifest()
+        if count is None:
+            # Only one process may split the data file
+            with FileLock(self.directory + ".lock").exclusive():
+                count = self._read_manifest()
+                if count is None:
+                    self._split()
+                    return self
+        self._open_shards(count)
+        paths = [shard.path for shard in self.shards]
+        workers = min(self.workers, count)
+        if workers > 1:
+            with ProcessPoolExecutor(workers) as pool:
+                loading = [pool.submit(load_shard, path, self.compact) for path in paths]
+                loaded = [self._loaded(path, future.result) for path, future in zip(paths, loading)]
+        else:
+            loaded = [self._loaded(path, load_shard, path, self.compact) for path in paths]
+        for shard, (signature, records) in zip(self.shards, loaded):
+            shard._signature = signature
+            shard._records = records
+        return self
+
+    def flush(self):
+        """
+        Write all pending changes to disk now (each dirty shard once).
+        """
+        self._each("flush")
+
+    def save(self):
+        """
+        Rewrite every shard.
+        """
+        self._each("save")
+
+    def close(self):
+        self._each("close")
+
+    def refresh(self):
+        """
+        Re-read the shards other processes have replaced.
+        """
+        for shard in self.shards:
+            shard.refresh()
+
+    def signature(self):
+        return [signature for shard in self.shards for signature in shard.signature()]
+
+    @contextmanager
+    def batch(self):
+        """
+        Group several changes so each shard they touch is written once.
+        Holds every shard's in-process lock until the batch ends.
+        """
+        with ExitStack() as stack:
+            for shard in self.shards:
+                stack.enter_context(shard.batch())
+            yield self
+
+    def patch(self, student_id, fields):
+        self._shard(student_id).patch(student_id, fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # --- Mapping interface -------------------------------------
+
+    def __getitem__(self, student_id):
+        return self._shard(student_id)[student_id]
+
+    def __setitem__(self, student_id, record):
+        self._shard(student_id)[student_id] = record
+
+    def __delitem__(self, student_id):
+        del self._shard(student_id)[student_id]
+
+    def __contains__(self, student_id):
+        return student_id in self._shard(student_id)
+
+    def __iter__(self):
+        for shard in self.shards:
+            yield from shard
+
+    def __len__(self):
+        return sum(len(shard) for shard in self.shards)
+
+    def items(self):
+        for shard in self.shards:
+            yield from shard.items()
+
+    # --- Shards ------------------------------------------------
+
+    def _shard(self, student_id):
+        return self.shards[shard_of(student_id, len(self.shards))]
+
+    def _open_shards(self, count):
+        self.shards = [JsonStore(os.path.join(self.directory, f"shard-{number:03d}.json"),
+                                 compact=self.compact, **self._options)
+                       for number in range(count)]
+
+    @staticmethod
+    def _loaded(path, read, *args):
+        """
+        Return read(*args), the (signature, records) of the shard at
+        path, reporting any damage as StoreFormatError for that shard.
+        """
+        try:
+            return read(*args)
+        except ValueError as e:
+            raise StoreFormatError(f"{path}: {e}", path) from e
+
+    def _read_manifest(self):
+        """
+        Return the number of shards recorded in the manifest, or None
+        if there is no shard directory yet.
+        """
+        try:
+            with open(self.manifest_path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            data = None
+        if (not isinstance(data, dict) or data.get("version") != SHARD_VERSION
+                or not isinstance(data.get("shards"), int) or data["shards"] < 1):
+            # Without the manifest no shard can be trusted
+            raise StoreFormatError(f"{self.manifest_path} is not a shard manifest", self.directory)
+        return data["shards"]
+
+    def _split(self):
+        """
+        Create the shard directory from the JSON data file (or empty).
+        The manifest is written last, so an interrupted split is simply
+        done again.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self._open_shards(self._count)
+        for student_id, record in read_snapshot(self.path, self.compact).items():
+            self._shard(student_id)._records[student_id] = record
+        for shard in self.shards:
+            write_snapshot(shard.path, shard._records, snapshot_format=shard.snapshot_format)
+            shard._signature = file_signature(shard.path)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": SHARD_VERSION, "shards": self._count}, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _each(self, method):
+        """
+        Call a method on every shard, then report the conflicts any of
+        them found as one StoreConflictError.
+        """
+        conflicts = []
+        for shard in self.shards:
+            try:
+                getattr(shard, method)()
+            except StoreConflictError as e:
+                conflicts.extend(e.student_ids)
+        if conflicts:
+            raise StoreConflictError(conflicts)
+
+
+# Engine names accepted by open_store()
+ENGINES = {
+    "json": JsonStore,
+    "journal": JournalStore,
+    "sqlite": SqliteStore,
+    "lazy": LazyStore,
+    "sharded": ShardedStore,
+}
+
+
+def open_store(engine, path, **options):
+    """
+    Create an (unloaded) store for the named engine.
+    Extra keyword options (such as flush_every and flush_interval) are
+    passed on to the store.
+    Raises ValueError for unknown engine names.
+    """
+    try:
+        store_class = ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown storage engine '{engine}'. Choose from: {', '.join(ENGINES)}")
+    return store_class(path, **options)
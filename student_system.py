@@ -4,17 +4,30 @@
 # ------------------------------------------------------------
 # Features:
 #   - Register students with validation
-#   - Login with password hashing (SHA-256)
-#   - Persistent storage using JSON
+#   - Login with salted password hashing (scrypt/PBKDF2, see student_passwords.py)
+#   - Persistent storage using JSON (or a journal/SQLite, see student_storage.py)
 #   - View, search, delete, and profile functions
+#   - Operation metrics and profiling (--metrics/--profile, see student_metrics.py)
+#   - Login activity reports (see student_activity.py)
 #   - Uses required constructs: for loops, while loops, conditionals, file I/O, functions
 # ------------------------------------------------------------
 
+import argparse
 import json
-import hashlib
-import re
 import os
-from datetime import datetime
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+from student_activity import ActivityLog
+from student_index import LookupIndex, SearchIndex, rank_matches
+from student_listing import DEFAULT_FIELDS, Ordering, format_page
+from student_metrics import PROFILE_MODES, Metrics, MetricsExporter, instrumented, profiling
+from student_passwords import hash_many, hash_password, verify_password
+from student_storage import SqliteStore, StoreConflictError, StoreFormatError, StoreLockedError, open_store
+from student_validation import (EMAIL_RE, MIN_PASSWORD_LENGTH, REQUIRED_ID_PATTERN, REQUIRED_ID_RE, clean_email,
+                                clean_id, clean_name)
 
 # Optional: Try to import colorama for colored output
 # If not available, define minimal fallbacks (no crash)
@@ -38,6 +51,116 @@ except ImportError:
 # Data file for persistence
 DATA_FILE = "students.json"
 
+# Storage engine: "json" rewrites the whole file on every change,
+# "journal" appends record-level changes and compacts in the background,
+# "sqlite" keeps records in an indexed database (students.db),
+# "lazy" memory-maps students.json and decodes records only when used,
+# "sharded" splits the records over SHARD_COUNT files by student ID
+STORAGE_ENGINE = os.environ.get("STUDENT_STORAGE", "json")
+
+# Number of shard files a new sharded store is split into
+SHARD_COUNT = int(os.environ.get("STUDENT_SHARDS", "16"))
+
+# Format data files are written in: "json" (pretty-printed) or "binary"
+# (compact, with checksums; see student_snapshot.py). Either is read.
+SNAPSHOT_FORMAT = os.environ.get("STUDENT_SNAPSHOT", "json")
+
+# Write coalescing: pending changes are flushed once this many have
+# piled up, or this many seconds after the first one (0 = no timer).
+# The defaults write every change immediately.
+FLUSH_EVERY = int(os.environ.get("STUDENT_FLUSH_EVERY", "1"))
+FLUSH_INTERVAL = float(os.environ.get("STUDENT_FLUSH_INTERVAL", "0"))
+
+# Keep records in memory as compact StudentRecord objects instead of
+# dicts (worth it for very large rosters; see student_records.py)
+COMPACT_RECORDS = os.environ.get("STUDENT_COMPACT", "") == "1"
+
+# Operation metrics export (see student_metrics.py): file to write,
+# seconds between writes, and optional profiling of the whole run
+METRICS_FILE = os.environ.get("STUDENT_METRICS")
+METRICS_INTERVAL = float(os.environ.get("STUDENT_METRICS_INTERVAL", "60"))
+PROFILE = os.environ.get("STUDENT_PROFILE") or None
+
+# Number of search results shown per page
+SEARCH_PAGE_SIZE = 20
+
+# Number of students shown per page by View All Students
+LIST_PAGE_SIZE = 20
+
+
+def new_record(name, email, password_hash):
+    """
+    Build the record stored for a newly registered student.
+    """
+    return {
+        "name": name,
+        "email": email,
+        "password_hash": password_hash,
+        "registered_on": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "login_count": 0,
+        "last_login": None
+    }
+
+
+class StudentError(Exception):
+    """
+    Raised by the non-interactive methods when a request is rejected
+    (duplicate ID, wrong password, ...). The message is meant for the user.
+    """
+
+
+# --- API types ------------------------------------------------
+# What the non-interactive methods take and return. A Student is a
+# snapshot of a record without its password hash.
+
+@dataclass(frozen=True)
+class Student:
+    student_id: str
+    name: str
+    email: str
+    registered_on: str
+    login_count: int = 0
+    last_login: Optional[str] = None
+
+    @classmethod
+    def from_record(cls, student_id, record):
+        return cls(student_id, record["name"], record["email"], record["registered_on"],
+                   record["login_count"], record["last_login"])
+
+
+@dataclass(frozen=True)
+class Registration:
+    name: str
+    student_id: str
+    email: str
+    password: str
+
+
+@dataclass
+class SearchPage:
+    students: list[Student]
+    total: int  # matches in all pages
+
+
+@dataclass
+class StudentPage:
+    students: list[Student]
+    total: int                     # students in the roster
+    cursor: Optional[list] = None  # resumes after the last student; None on the last page
+
+
+@dataclass(frozen=True)
+class ActivityPeriod:
+    period: str                   # "YYYY-MM-DD" or "YYYY-MM-DD HH:00"
+    logins: int
+    active: Optional[int] = None  # distinct students (daily periods only)
+
+
+@dataclass
+class BatchResult:
+    registered: list[str] = field(default_factory=list)
+    errors: list[tuple[str, str]] = field(default_factory=list)  # (student ID, message)
+
 
 class StudentSystem:
     """
@@ -45,52 +168,204 @@ class StudentSystem:
     Stores data in a JSON file for persistence across sessions.
     """
 
-    def __init__(self):
+    def __init__(self, data_file=None):
         """
         Initialize the system by loading existing student data.
         If data file doesn't exist, start with an empty dictionary.
+        data_file overrides DATA_FILE (used by the service and benchmarks).
         """
+        self.data_file = data_file or DATA_FILE
+        self.metrics = Metrics()  # Operation counters and latencies
         self.students = self.load_data()
+        self.metrics.gauge("students", lambda: len(self.students))
+        self.metrics.gauge("store_bytes_written", lambda: self.students.bytes_written)
+        self.activity = ActivityLog(self.data_file + ".activity")  # Every login, for reports
         self.current_user = None  # Tracks logged-in student ID
+        self._search_index = None  # Built on first search, then kept up to date
+        self._orderings = {}  # Sort order -> Ordering, built on first listing
+        self._lookups = None  # Email/name lookups, loaded or built on first use
+        self._lookups_signature = None  # Store version the saved lookups matched
+        self.lookup_file = self.data_file + ".keys"
+        self._indexed_changes = self.students.external_changes  # see _drop_stale_indexes
 
+    @instrumented("load")
     def load_data(self):
         """
         Load student records from students.json.
-        Returns a dictionary of students, keyed by student ID.
-        If file is missing or invalid, returns empty dict.
+        Returns a store (a dictionary-like object keyed by student ID)
+        that persists every change made through it.
+        If file is missing or invalid, the store starts out empty.
+        Raises StoreFormatError if the data still cannot be read once the
+        unreadable file has been moved aside.
         """
-        if os.path.exists(DATA_FILE):
-            try:
-                with open(DATA_FILE, 'r') as f:
-                    data = json.load(f)
-                    # Ensure data is a dictionary
-                    if isinstance(data, dict):
-                        return data
-                    else:
-                        print(Fore.YELLOW + "Warning: Data file format invalid. Starting fresh.")
-                        return {}
-            except (json.JSONDecodeError, IOError) as e:
-                print(Fore.YELLOW + f"Warning: Could not read data file ({e}). Starting fresh.")
-        return {}
+        try:
+            return self.create_store().load()
+        except StoreFormatError as e:
+            print(Fore.YELLOW + f"Warning: Data file format invalid ({e}). Starting fresh.")
+            unreadable = e.path or self.data_file
+        except (json.JSONDecodeError, IOError) as e:
+            print(Fore.YELLOW + f"Warning: Could not read data file ({e}). Starting fresh.")
+            unreadable = self.data_file
+        # Move the unreadable file (or shard) aside so the first save
+        # cannot destroy it
+        try:
+            os.replace(unreadable, unreadable + ".corrupt")
+            print(Fore.YELLOW + f"The unreadable file was kept as {unreadable}.corrupt")
+        except OSError:
+            pass
+        # A store whose load failed may be half filled: start over
+        try:
+            return self.create_store().load()
+        except (json.JSONDecodeError, IOError) as e:
+            raise StoreFormatError(f"Could not read {unreadable} ({e})", unreadable) from e
+
+    def create_store(self):
+        """
+        Create the (unloaded) store for the configured storage engine.
+        """
+        options = {"shards": SHARD_COUNT} if STORAGE_ENGINE == "sharded" else {}
+        return open_store(STORAGE_ENGINE, self.data_file, compact=COMPACT_RECORDS,
+                          snapshot_format=SNAPSHOT_FORMAT, flush_every=FLUSH_EVERY,
+                          flush_interval=FLUSH_INTERVAL, **options)
+
+    def refresh(self):
+        """
+        Pick up changes saved by other processes (other terminals or the
+        service) since the data was last read.
+        """
+        self.students.refresh()
+        if self.current_user is not None and self.current_user not in self.students:
+            self.current_user = None
+
+    def _drop_stale_indexes(self):
+        """
+        Forget the search index, listing orders and lookups if the store
+        has picked up other processes' changes since they were built.
+        """
+        if self.students.external_changes != self._indexed_changes:
+            self._indexed_changes = self.students.external_changes
+            self._search_index = None
+            self._orderings = {}
+            if self._lookups is not None:
+                self._lookups.close()
+            self._lookups = None
+
+    def search_index(self):
+        """
+        Return the search index over student IDs and names.
+        It is built from the store the first time it is needed.
+        """
+        self._drop_stale_indexes()
+        if self._search_index is None:
+            self._search_index = SearchIndex.build(self.students.items())
+        return self._search_index
+
+    def ordering(self, sort):
+        """
+        Return the listing order for a sort key (see student_listing.py).
+        It is built from the store the first time it is needed.
+        """
+        self._drop_stale_indexes()
+        if sort not in self._orderings:
+            self._orderings[sort] = Ordering.build(sort, self.students.items())
+        return self._orderings[sort]
 
+    def lookup_index(self):
+        """
+        Return the email -> ID and name -> IDs lookups.
+        The first time they are needed they are read from the .keys
+        file saved at the last close, or built from the store if that
+        file does not match the data on disk.
+        """
+        if self._lookups is None:
+            self.students.flush()  # the signature only covers flushed changes
+        self._drop_stale_indexes()
+        if self._lookups is None:
+            signature = self.students.signature()
+            self._lookups = LookupIndex.load(self.lookup_file, signature)
+            if self._lookups is None:
+                self._lookups = LookupIndex.build(self.students.items())
+            else:
+                self._lookups_signature = signature
+        return self._lookups
+
+    def add_record(self, student_id, record):
+        """
+        Store a new student record and add it to the search index.
+        Validation is up to the caller.
+        """
+        self.store_record(student_id, record)
+        self.index_record(student_id, record)
+
+    def store_record(self, student_id, record):
+        """
+        The store half of add_record(): save the record only.
+        """
+        self.students[student_id] = record
+
+    def index_record(self, student_id, record):
+        """
+        The index half of add_record(): add a stored record to the
+        lookups, search index and listing orders already built.
+        """
+        if self._lookups is not None:
+            self._lookups.add(student_id, record)
+        if self._search_index is not None:
+            self._search_index.add(student_id, record["name"])
+        for ordering in self._orderings.values():
+            ordering.add(student_id, record)
+
+    @instrumented("save")
     def save_data(self):
         """
         Save current student records to students.json.
         Overwrites the file with up-to-date data.
         """
+        written = self.students.bytes_written
         try:
-            with open(DATA_FILE, 'w') as f:
-                json.dump(self.students, f, indent=4)
+            self.students.save()
         except IOError as e:
             print(Fore.RED + f"Error saving data: {e}")
+        self.metrics.count("save_bytes_total", self.students.bytes_written - written)
+
+    def flush(self):
+        """
+        Write any pending (coalesced) changes to disk now.
+        """
+        self.students.flush()
+
+    def close(self):
+        """
+        Flush pending changes and close the store and activity log.
+        Lookups built or changed this session are saved for the next one.
+        """
+        self.activity.close()
+        self.students.close()
+        self._drop_stale_indexes()
+        if self._lookups is not None:
+            signature = self.students.signature()
+            if signature != self._lookups_signature:
+                try:
+                    self._lookups.save(self.lookup_file, signature)
+                except OSError as e:
+                    print(Fore.YELLOW + f"Warning: Could not save lookup index ({e}).")
+            self._lookups.close()
+            self._lookups = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
+    @instrumented("hash_password")
     def hash_password(self, password):
         """
-        Hash a password using SHA-256 for secure storage.
+        Hash a password with a salted KDF for secure storage.
         Input: plaintext password (string)
-        Output: hexadecimal hash string
+        Output: hash string (algorithm, cost, salt and key)
         """
-        return hashlib.sha256(password.encode()).hexdigest()
+        return hash_password(password)
 
     def validate_email(self, email):
         """
@@ -98,8 +373,289 @@ class StudentSystem:
         Returns True if valid, False otherwise.
         Pattern: local@domain.tld
         """
-        pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
-        return re.match(pattern, email) is not None
+        return EMAIL_RE.match(email) is not None
+
+    # --- Non-interactive operations ----------------------------
+    # The programmatic API: these take already-cleaned values, never
+    # prompt or print, return the types above and raise StudentError
+    # when a request is rejected. The menu below is a client of them.
+
+    def check_registration(self, name: str, student_id: str, email: str, password: str) -> None:
+        """
+        Apply the registration rules without storing anything.
+        Raises StudentError describing the first rule that fails.
+        """
+        if not name or not student_id or not email or not password:
+            raise StudentError("All fields are required.")
+        if len(password) < MIN_PASSWORD_LENGTH:
+            raise StudentError(f"Password must be at least {MIN_PASSWORD_LENGTH} characters long.")
+        if not self.validate_email(email):
+            raise StudentError("Invalid email format.")
+        if REQUIRED_ID_RE is not None and REQUIRED_ID_RE.fullmatch(student_id) is None:
+            raise StudentError(f"Invalid student ID format (must match {REQUIRED_ID_PATTERN}).")
+        if student_id in self.students:
+            raise StudentError(f"Student ID '{student_id}' is already registered.")
+        if self.lookup_index().by_email(email) is not None:
+            raise StudentError(f"Email '{email}' is already registered.")
+
+    @instrumented("register")
+    def register_student(self, name: str, student_id: str, email: str, password: str) -> Student:
+        """
+        Validate and store a new student.
+        Returns the new student.
+        """
+        self.check_registration(name, student_id, email, password)
+        record = new_record(name, email, self.hash_password(password))
+        self.add_record(student_id, record)
+        return Student.from_record(student_id, record)
+
+    @instrumented("register_many")
+    def register_many(self, registrations: Iterable[Registration], workers: Optional[int] = None) -> BatchResult:
+        """
+        Validate and store many students, hashing their passwords in
+        worker processes and writing them to disk together.
+        A rejected registration does not stop the others.
+        Returns the IDs registered and (student ID, message) per rejection.
+        """
+        result = BatchResult()
+        accepted = []
+        seen = set()
+        seen_emails = set()
+        for registration in registrations:
+            try:
+                self.check_registration(registration.name, registration.student_id,
+                                        registration.email, registration.password)
+                if registration.student_id in seen:
+                    raise StudentError(f"Student ID '{registration.student_id}' is already registered.")
+                if registration.email.lower() in seen_emails:
+                    raise StudentError(f"Email '{registration.email}' is already registered.")
+            except StudentError as e:
+                result.errors.append((registration.student_id, str(e)))
+                continue
+            seen.add(registration.student_id)
+            seen_emails.add(registration.email.lower())
+            accepted.append(registration)
+
+        with self.metrics.timer("hash_password_batch"):
+            hashes = hash_many([registration.password for registration in accepted], workers)
+        with self.students.batch():
+            for registration, password_hash in zip(accepted, hashes):
+                self.add_record(registration.student_id,
+                                new_record(registration.name, registration.email, password_hash))
+                result.registered.append(registration.student_id)
+        return result
+
+    def get_record(self, student_id: str):
+        """
+        Return the stored record for student_id (including the password
+        hash, for callers that check passwords themselves).
+        Raises StudentError if there is no such student.
+        """
+        try:
+            return self.students[student_id]
+        except KeyError:
+            raise StudentError("Student ID not found.")
+
+    def get_student(self, student_id: str) -> Student:
+        """
+        Return the student with this ID.
+        Raises StudentError if there is no such student.
+        """
+        return Student.from_record(student_id, self.get_record(student_id))
+
+    @instrumented("get_many")
+    def get_many(self, student_ids: Iterable[str]) -> dict[str, Student]:
+        """
+        Return the students with these IDs, keyed by ID.
+        IDs that are not registered are left out.
+        """
+        found = {}
+        for student_id in student_ids:
+            record = self.students.get(student_id)
+            if record is not None:
+                found[student_id] = Student.from_record(student_id, record)
+        return found
+
+    def resolve_login(self, identifier: str) -> str:
+        """
+        Return the student ID for what a student typed to log in: their
+        student ID or their email address.
+        Raises StudentError for an email nobody registered with.
+        """
+        identifier = identifier.strip()
+        if "@" not in identifier:
+            return identifier.upper()
+        student_id = self.lookup_index().by_email(identifier)
+        if student_id is None:
+            raise StudentError("Email not found.")
+        return student_id
+
+    def find_by_email(self, email: str) -> Optional[Student]:
+        """
+        Return the student registered with this email, or None.
+        """
+        student_id = self.lookup_index().by_email(email)
+        return None if student_id is None else self.get_student(student_id)
+
+    def find_by_name(self, name: str) -> list[Student]:
+        """
+        Return the students with exactly this name (ignoring case and
+        spacing), by ID.
+        """
+        return list(self.get_many(self.lookup_index().by_name(name)).values())
+
+    def record_login(self, student_id, password_hash=None):
+        """
+        Update the login statistics of a student who has just logged in.
+        Only these two fields are written, plus password_hash when an
+        upgraded hash is given.
+        """
+        user = self.save_login(student_id, password_hash)
+        self.index_login(student_id)
+        return user
+
+    def save_login(self, student_id, password_hash=None):
+        """
+        The store half of record_login(): write the login statistics and
+        log the login. Returns the record as it was before the login.
+        """
+        user = self.students[student_id]
+        now = datetime.now()
+        fields = {
+            "login_count": user["login_count"] + 1,
+            "last_login": now.strftime("%Y-%m-%d %H:%M:%S")
+        }
+        if password_hash is not None:
+            fields["password_hash"] = password_hash
+        self.students.patch(student_id, fields)
+        self.activity.record(student_id, now.timestamp())
+        return user
+
+    def index_login(self, student_id):
+        """
+        The index half of record_login(): move the student within the
+        by-logins listing order, if it has been built.
+        """
+        if "logins" in self._orderings:
+            self._orderings["logins"].add(student_id, self.students[student_id])
+
+    @instrumented("login")
+    def authenticate(self, student_id: str, password: str) -> Student:
+        """
+        Check a student's password and record the login.
+        Returns the student as of this login.
+        Raises StudentError for an unknown ID or a wrong password.
+        """
+        user = self.get_record(student_id)
+        with self.metrics.timer("verify_password"):
+            ok, stale = verify_password(password, user["password_hash"])
+        if not ok:
+            raise StudentError("Incorrect password.")
+        # Hashes made with older settings (or legacy SHA-256) are
+        # replaced while the plaintext password is at hand
+        self.record_login(student_id, self.hash_password(password) if stale else None)
+        return self.get_student(student_id)
+
+    @instrumented("search")
+    def find_students(self, query: str, limit: Optional[int] = None, offset: int = 0) -> SearchPage:
+        """
+        Search IDs and names (case-insensitive), best matches first.
+        """
+        if isinstance(self.students, SqliteStore):
+            # The database finds the matches itself, so it is never copied
+            # into a SearchIndex that other processes' changes would outdate
+            matches = dict(self.students.search(query.lower()))
+            student_ids, total = rank_matches(query, ((student_id, record["name"])
+                                                      for student_id, record in matches.items()),
+                                              limit=limit, offset=offset)
+            return SearchPage([Student.from_record(student_id, matches[student_id])
+                               for student_id in student_ids], total)
+        student_ids, total = self.search_index().search(query, limit=limit, offset=offset)
+        return SearchPage([Student.from_record(student_id, self.students[student_id])
+                           for student_id in student_ids], total)
+
+    @instrumented("list")
+    def list_students(self, sort: str = "id", limit: Optional[int] = None, offset: int = 0,
+                      cursor: Optional[list] = None, reverse: bool = False) -> StudentPage:
+        """
+        Return one page of the roster in sort order (id, name,
+        registered or logins), starting offset students after cursor.
+        Raises StudentError for an unknown sort or a cursor from another sort.
+        """
+        try:
+            student_ids, cursor = self.ordering(sort).page(limit, offset, cursor, reverse)
+        except ValueError as e:
+            raise StudentError(str(e))
+        except TypeError:
+            raise StudentError(f"The cursor does not belong to the '{sort}' order.")
+        return StudentPage([Student.from_record(student_id, self.students[student_id])
+                            for student_id in student_ids], len(self.students), cursor)
+
+    def student_count(self) -> int:
+        return len(self.students)
+
+    def login_activity(self, days: int = 30, by: str = "day") -> list[ActivityPeriod]:
+        """
+        Return logins per day (with distinct students) or per hour over
+        the last days days, oldest first. Read from the rollups, so the
+        cost depends on the number of periods, not of logins.
+        """
+        if by not in ("day", "hour"):
+            raise StudentError(f"Unknown period '{by}' (use day or hour).")
+        self.activity.catch_up()
+        end = datetime.now()
+        start = (end - timedelta(days=days - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        return [ActivityPeriod(*period) for period in
+                self.activity.logins(start.timestamp(), end.timestamp(), by)]
+
+    def active_students(self, days: int = 30) -> int:
+        """
+        Number of students who logged in during the last days days.
+        """
+        self.activity.catch_up()
+        return self.activity.active_count((datetime.now() - timedelta(days=days)).timestamp())
+
+    def dormant_students(self, days: int = 90) -> list[Student]:
+        """
+        Students registered more than days days ago who have not logged
+        in since, least recently seen first. Logins from before the
+        activity log existed are taken from last_login.
+        """
+        self.activity.catch_up()
+        cutoff = datetime.now() - timedelta(days=days)
+        cutoff_text = cutoff.strftime("%Y-%m-%d %H:%M:%S")
+        dormant = []
+        for student_id, record in self.students.items():
+            if record["registered_on"] >= cutoff_text:
+                continue
+            if record["last_login"] is not None and record["last_login"] >= cutoff_text:
+                continue
+            seen = self.activity.last_login(student_id)
+            if seen is not None and seen >= cutoff.timestamp():
+                continue
+            dormant.append(Student.from_record(student_id, record))
+        dormant.sort(key=lambda student: (student.last_login or "", student.student_id))
+        return dormant
+
+    @instrumented("delete")
+    def remove_student(self, student_id: str) -> None:
+        """
+        Delete a student (logging them out if they are the current user).
+        Raises StudentError if there is no such student.
+        """
+        if student_id not in self.students:
+            raise StudentError("Student ID not found.")
+        del self.students[student_id]
+        if self._search_index is not None:
+            self._search_index.remove(student_id)
+        if self._lookups is not None:
+            self._lookups.remove(student_id)
+        for ordering in self._orderings.values():
+            ordering.remove(student_id)
+        if self.current_user == student_id:
+            self.current_user = None
+
+    # --- Interactive menu actions ------------------------------
 
     def register(self):
         """
@@ -111,39 +667,17 @@ class StudentSystem:
         print("Student Registration")
         print("-" * 40)
 
-        name = input("Enter full name: ").strip().title()
-        student_id = input("Enter unique student ID: ").strip().upper()
-        email = input("Enter email address: ").strip().lower()
+        name = clean_name(input("Enter full name: "))
+        student_id = clean_id(input("Enter unique student ID: "))
+        email = clean_email(input("Enter email address: "))
         password = input("Set a password (minimum 6 characters): ")
 
-        # Input validation
-        if not name or not student_id or not email or not password:
-            print(Fore.RED + "Error: All fields are required.")
-            return
-
-        if len(password) < 6:
-            print(Fore.RED + "Error: Password must be at least 6 characters long.")
-            return
-
-        if not self.validate_email(email):
-            print(Fore.RED + "Error: Invalid email format.")
-            return
-
-        if student_id in self.students:
-            print(Fore.RED + f"Error: Student ID '{student_id}' is already registered.")
+        try:
+            self.register_student(name, student_id, email, password)
+        except StudentError as e:
+            print(Fore.RED + f"Error: {e}")
             return
 
-        # Create new student record
-        self.students[student_id] = {
-            "name": name,
-            "email": email,
-            "password_hash": self.hash_password(password),
-            "registered_on": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "login_count": 0,
-            "last_login": None
-        }
-
-        self.save_data()
         print(Fore.GREEN + f"Success: Student '{name}' registered.")
 
     def login(self):
@@ -155,59 +689,59 @@ class StudentSystem:
         print("Student Login")
         print("-" * 40)
 
-        student_id = input("Student ID: ").strip().upper()
+        identifier = input("Student ID or email: ")
         password = input("Password: ")
 
-        # Check existence
-        if student_id not in self.students:
-            print(Fore.RED + "Error: Student ID not found.")
-            return
-
-        user = self.students[student_id]
-
-        # Verify password
-        if user["password_hash"] != self.hash_password(password):
-            print(Fore.RED + "Error: Incorrect password.")
+        try:
+            student_id = self.resolve_login(identifier)
+            user = self.authenticate(student_id, password)
+        except StudentError as e:
+            print(Fore.RED + f"Error: {e}")
             return
 
-        # Update login metadata
-        user["login_count"] += 1
-        user["last_login"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.save_data()
-
         # Set current session user
         self.current_user = student_id
-        print(Fore.GREEN + f"Success: Logged in as {user['name']}.")
+        print(Fore.GREEN + f"Success: Logged in as {user.name}.")
 
     def view_all_students(self):
         """
-        Display all registered students.
-        Uses a for loop over dictionary items (fulfills coursework requirement).
+        Display all registered students, one page at a time.
         Shows key details: name, ID, email, registration time, login count.
+        Each page is formatted by a for loop (coursework requirement) and
+        written in a single call.
         """
         print("\n" + "=" * 50)
         print("All Registered Students")
         print("=" * 50)
 
-        if not self.students:
+        if self.student_count() == 0:
             print("No students registered yet.")
             return
 
-        # For-loop demonstration (required for coursework)
-        count = 1
-        for student_id, data in self.students.items():
-            print(f"{count}. Name: {data['name']}")
-            print(f"   ID: {student_id}")
-            print(f"   Email: {data['email']}")
-            print(f"   Registered: {data['registered_on']}")
-            print(f"   Logins: {data['login_count']}")
-            print("-" * 40)
-            count += 1
+        sort = input("Sort by id/name/registered/logins [id]: ").strip().lower() or "id"
+        shown = 0
+        cursor = None
+        while True:
+            try:
+                page = self.list_students(sort, limit=LIST_PAGE_SIZE, cursor=cursor,
+                                          reverse=sort == "logins")
+            except StudentError as e:
+                print(Fore.RED + f"Error: {e}")
+                return
+            sys.stdout.write(format_page(page.students, DEFAULT_FIELDS, number=shown + 1))
+            shown += len(page.students)
+            cursor = page.cursor
+            if cursor is None:
+                return
+            more = input(f"Showing {shown} of {page.total} students. Show more? (y/N): ").strip().lower()
+            if more != 'y':
+                return
 
     def search_student(self):
         """
         Search for a student by name or ID (case-insensitive).
-        Uses a for loop to iterate and match.
+        Best matches come first, shown one page at a time.
+        Uses a for loop to print each match.
         """
         print("\n" + "-" * 40)
         print("Search Student")
@@ -218,15 +752,23 @@ class StudentSystem:
             print("Search term cannot be empty.")
             return
 
-        found = False
-        # For-loop for search (coursework requirement)
-        for student_id, data in self.students.items():
-            if query in student_id.lower() or query in data["name"].lower():
-                print(f"Found: {data['name']} | ID: {student_id} | Email: {data['email']}")
-                found = True
+        offset = 0
+        while True:
+            page = self.find_students(query, limit=SEARCH_PAGE_SIZE, offset=offset)
+            if page.total == 0:
+                print("No matching student found.")
+                return
+
+            # For-loop over the matches (coursework requirement)
+            for student in page.students:
+                print(f"Found: {student.name} | ID: {student.student_id} | Email: {student.email}")
 
-        if not found:
-            print("No matching student found.")
+            offset += len(page.students)
+            if offset >= page.total:
+                return
+            more = input(f"Showing {offset} of {page.total} matches. Show more? (y/N): ").strip().lower()
+            if more != 'y':
+                return
 
     def delete_student(self):
         """
@@ -238,19 +780,17 @@ class StudentSystem:
         print("-" * 40)
 
         student_id = input("Enter Student ID to delete: ").strip().upper()
-        if student_id in self.students:
-            name = self.students[student_id]["name"]
-            confirm = input(f"Are you sure you want to delete '{name}' (ID: {student_id})? (y/N): ").strip().lower()
-            if confirm == 'y':
-                del self.students[student_id]
-                self.save_data()
-                if self.current_user == student_id:
-                    self.current_user = None
-                print(f"Student '{name}' has been deleted.")
-            else:
-                print("Operation cancelled.")
+        try:
+            name = self.get_student(student_id).name
+        except StudentError as e:
+            print(e)
+            return
+        confirm = input(f"Are you sure you want to delete '{name}' (ID: {student_id})? (y/N): ").strip().lower()
+        if confirm == 'y':
+            self.remove_student(student_id)
+            print(f"Student '{name}' has been deleted.")
         else:
-            print("Student ID not found.")
+            print("Operation cancelled.")
 
     def view_profile(self):
         """
@@ -261,23 +801,23 @@ class StudentSystem:
             print("You must be logged in to view your profile.")
             return
 
-        data = self.students[self.current_user]
+        student = self.get_student(self.current_user)
         print("\n" + "-" * 40)
         print("Your Profile")
         print("-" * 40)
-        print(f"Name: {data['name']}")
-        print(f"Student ID: {self.current_user}")
-        print(f"Email: {data['email']}")
-        print(f"Registered on: {data['registered_on']}")
-        print(f"Total logins: {data['login_count']}")
-        print(f"Last login: {data['last_login'] if data['last_login'] else 'Never'}")
+        print(f"Name: {student.name}")
+        print(f"Student ID: {student.student_id}")
+        print(f"Email: {student.email}")
+        print(f"Registered on: {student.registered_on}")
+        print(f"Total logins: {student.login_count}")
+        print(f"Last login: {student.last_login if student.last_login else 'Never'}")
 
     def logout(self):
         """
         Log out the current user.
         """
         if self.current_user:
-            name = self.students[self.current_user]["name"]
+            name = self.get_student(self.current_user).name
             print(f"Goodbye, {name}. You have been logged out.")
             self.current_user = None
         else:
@@ -292,11 +832,24 @@ class StudentSystem:
         print("Welcome to the Student Registration and Login System")
         print("This system supports registration, secure login, and student management.")
 
+        try:
+            self._menu_loop()
+        finally:
+            # Pending changes must reach the disk however the loop ends
+            self.close()
+
+    def _menu_loop(self):
+        """
+        Show the menu and dispatch choices until the user exits.
+        """
         while True:
             # Display session status
             print("\n" + "=" * 50)
+            if self.current_user and not self.get_many([self.current_user]):
+                # Deleted from another terminal
+                self.current_user = None
             if self.current_user:
-                name = self.students[self.current_user]["name"]
+                name = self.get_student(self.current_user).name
                 print(f"Status: Logged in as {name} ({self.current_user})")
             else:
                 print("Status: Guest (not logged in)")
@@ -317,6 +870,8 @@ class StudentSystem:
 
             # Handle menu selection
             try:
+                # Other terminals may have saved changes in the meantime
+                self.refresh()
                 if choice == '1':
                     self.register()
                 elif choice == '2':
@@ -339,11 +894,170 @@ class StudentSystem:
             except KeyboardInterrupt:
                 print("\n\nProgram interrupted. Exiting.")
                 break
+            except (StoreConflictError, StoreLockedError) as e:
+                print(Fore.RED + f"Error: {e}")
             except Exception as e:
                 print(f"An unexpected error occurred: {e}")
 
 
+def main(argv=None):
+    """
+    Command-line entry point.
+    With no arguments the interactive menu starts; the import and export
+    commands work on whole rosters without prompting.
+    """
+    parser = argparse.ArgumentParser(description="Student Registration and Login System")
+    commands = parser.add_subparsers(dest="command")
+
+    import_cmd = commands.add_parser("import", help="register students from a .csv or .jsonl file")
+    import_cmd.add_argument("path")
+    import_cmd.add_argument("--commit-every", type=int, default=0,
+                            help="commit after this many new students (default: once at the end)")
+    import_cmd.add_argument("--workers", type=int, default=os.cpu_count(),
+                            help="processes used to hash passwords")
+
+    list_cmd = commands.add_parser("list", help="print students a page at a time, sorted")
+    list_cmd.add_argument("--sort", choices=("id", "name", "registered", "logins"), default="id")
+    list_cmd.add_argument("--reverse", action="store_true", help="largest first")
+    list_cmd.add_argument("--fields", default=",".join(DEFAULT_FIELDS),
+                          help="comma-separated columns (student_id,name,email,registered_on,"
+                               "login_count,last_login)")
+    list_cmd.add_argument("--format", choices=("text", "jsonl", "csv"), default="text")
+    list_cmd.add_argument("--page-size", type=int, default=1000, help="rows written per call")
+    list_cmd.add_argument("--offset", type=int, default=0)
+    list_cmd.add_argument("--cursor", help="resume after the row a previous listing stopped at")
+    list_cmd.add_argument("--limit", type=int, help="stop after this many rows")
+
+    export_cmd = commands.add_parser("export", help="write all students to a .csv, .jsonl, "
+                                                    ".json or .snap (binary) file")
+    export_cmd.add_argument("path")
+
+    serve_cmd = commands.add_parser("serve", help="run the multi-user network service")
+    serve_cmd.add_argument("--host", default="127.0.0.1")
+    serve_cmd.add_argument("--port", type=int, default=8765)
+    serve_cmd.add_argument("--workers", type=int, default=None,
+                           help="processes used to hash passwords")
+
+    parser.add_argument("--metrics", default=METRICS_FILE, metavar="FILE",
+                        help="export operation metrics to FILE (.prom for Prometheus text, else JSON)")
+    parser.add_argument("--metrics-interval", type=float, default=METRICS_INTERVAL, metavar="SECONDS",
+                        help="seconds between metrics exports (default %(default)s)")
+    parser.add_argument("--profile", choices=PROFILE_MODES, default=PROFILE,
+                        help="profile the run with cProfile or tracemalloc")
+
+    audit_cmd = commands.add_parser("audit", help="check every stored student against the registration rules")
+    audit_cmd.add_argument("--workers", type=int, default=1,
+                           help="processes used for the format checks")
+    audit_cmd.add_argument("--report", metavar="FILE", help="also write every issue to FILE as JSON")
+
+    report_cmd = commands.add_parser("report", help="login activity: logins per day/hour, active or dormant students")
+    report_cmd.add_argument("kind", choices=("logins", "active", "dormant"))
+    report_cmd.add_argument("--days", type=int, default=None,
+                            help="period covered (default 30, or 90 for dormant)")
+    report_cmd.add_argument("--by", choices=("day", "hour"), default="day", help="period of each logins row")
+
+    args = parser.parse_args(argv)
+
+    with profiling(args.profile):
+        try:
+            system = StudentSystem()
+        # ValueError also covers storage settings that do not go together
+        # (such as STUDENT_STORAGE=lazy with STUDENT_SNAPSHOT=binary)
+        except (StoreFormatError, StoreLockedError, ValueError) as e:
+            print(Fore.RED + f"Error: {e}")
+            return 1
+        exporter = None
+        if args.metrics:
+            exporter = MetricsExporter(system.metrics, args.metrics, args.metrics_interval).start()
+        try:
+            with system:
+                return run_command(system, args, parser)
+        finally:
+            if exporter is not None:
+                exporter.stop()
+
+
+def print_report(system, kind, days=None, by="day"):
+    """
+    Print one login activity report (see StudentSystem.login_activity).
+    """
+    if days is None:
+        days = 90 if kind == "dormant" else 30
+    if kind == "logins":
+        print(f"{'Period':<17} {'Logins':>8} {'Active':>8}")
+        for period in system.login_activity(days, by):
+            active = "" if period.active is None else period.active
+            print(f"{period.period:<17} {period.logins:>8} {active:>8}")
+    elif kind == "active":
+        print(f"{system.active_students(days)} of {system.student_count()} students "
+              f"logged in during the last {days} days.")
+    else:
+        dormant = system.dormant_students(days)
+        sys.stdout.write(format_page(dormant, ("student_id", "name", "email", "last_login")))
+        print(f"{len(dormant)} students have not logged in for {days} days.")
+
+
+def run_command(system, args, parser):
+    """
+    Carry out the command chosen on the command line.
+    """
+    if args.command is None:
+        system.run()
+    elif args.command == "import":
+        from student_bulk import import_students, print_import_report
+        report = import_students(system, args.path,
+                                 commit_every=args.commit_every, workers=args.workers)
+        print_import_report(report)
+    elif args.command == "list":
+        from student_listing import decode_cursor, encode_cursor, parse_fields
+        try:
+            fields = parse_fields(args.fields)
+            cursor = decode_cursor(args.cursor) if args.cursor else None
+        except ValueError as e:
+            parser.error(str(e))
+        offset, remaining, shown = args.offset, args.limit, 0
+        while remaining is None or remaining > 0:
+            size = args.page_size if remaining is None else min(args.page_size, remaining)
+            try:
+                page = system.list_students(args.sort, limit=size, offset=offset,
+                                            cursor=cursor, reverse=args.reverse)
+            except StudentError as e:
+                print(Fore.RED + f"Error: {e}")
+                return
+            sys.stdout.write(format_page(page.students, fields, args.format,
+                                         number=args.offset + shown + 1, header=shown == 0))
+            shown += len(page.students)
+            offset = 0
+            cursor = page.cursor
+            if remaining is not None:
+                remaining -= len(page.students)
+            if cursor is None:
+                break
+        if cursor is not None:
+            print(f"More students follow; continue with --cursor '{encode_cursor(cursor)}'",
+                  file=sys.stderr)
+    elif args.command == "export":
+        from student_bulk import export_students
+        count = export_students(system.students, args.path)
+        print(Fore.GREEN + f"Exported {count} students to {args.path}.")
+    elif args.command == "audit":
+        from student_bulk import audit_students, print_audit_report
+        report = audit_students(system.students, args.workers)
+        print_audit_report(report)
+        if args.report:
+            with open(args.report, 'w') as f:
+                json.dump(report.to_dict(), f, indent=4)
+        return 1 if report.issues else 0
+    elif args.command == "report":
+        print_report(system, args.kind, args.days, args.by)
+    elif args.command == "serve":
+        from student_server import serve
+        serve(system, args.host, args.port, args.workers)
+
+
 # Entry point: only run if script is executed directly
 if __name__ == "__main__":
-    system = StudentSystem()
-    system.run()
\ No newline at end of file
+    # Go through the importable module so that helpers which import
+    # student_system (bulk import, service) share its classes
+    import student_system
+    sys.exit(student_system.main())
\ No newline at end of file
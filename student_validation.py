@@ -0,0 +1,180 @@
+# ------------------------------------------------------------
+# Batch Validation for the Student Registration and Login System
+# ------------------------------------------------------------
+# The registration rules as plain functions over rows of
+# (position, student_id, name, email), so a whole roster can be checked
+# in one pass: registration and bulk import apply them as students
+# arrive, and "python student_system.py audit" checks every stored
+# student (see student_bulk.py). Checks:
+#   - required fields present
+#   - email and student ID format (patterns compiled once); the ID
+#     format is only advice for the audit unless STUDENT_ID_PATTERN is
+#     set, since existing rosters use IDs such as "21/U/1234"
+#   - names written in their normalized form (clean_name)
+#   - duplicate student IDs and emails, ignoring case
+# Format checks run a chunk at a time, optionally in worker processes;
+# duplicates are found in the same pass by the parent process.
+# ------------------------------------------------------------
+
+import os
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from itertools import islice
+
+# Email format: local@domain.tld
+EMAIL_RE = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
+
+# Student ID format the audit reports departures from: upper-case
+# letters, digits, - and _ (at most 32)
+STUDENT_ID_RE = re.compile(r"^[A-Z0-9][A-Z0-9_-]{0,31}$")
+
+# Student ID format that registration and import insist on (a regular
+# expression the whole ID must match), or None to accept any ID
+REQUIRED_ID_PATTERN = os.environ.get("STUDENT_ID_PATTERN") or None
+REQUIRED_ID_RE = re.compile(REQUIRED_ID_PATTERN) if REQUIRED_ID_PATTERN else None
+
+MIN_PASSWORD_LENGTH = 6
+
+# Rows checked together (and sent to a worker at once)
+CHUNK_SIZE = 50000
+
+# Kinds of issue
+MISSING_FIELD = "missing_field"
+INVALID_EMAIL = "invalid_email"
+INVALID_ID = "invalid_id"
+NAME_NOT_NORMALIZED = "name_not_normalized"
+DUPLICATE_ID = "duplicate_id"
+DUPLICATE_EMAIL = "duplicate_email"
+
+
+def clean_name(name):
+    """
+    Normalized form of a name: single spaces, each word capitalized.
+    """
+    return " ".join(name.split()).title()
+
+
+def clean_id(student_id):
+    return student_id.strip().upper()
+
+
+def clean_email(email):
+    return email.strip().lower()
+
+
+@dataclass(frozen=True)
+class Issue:
+    position: int  # row number (line number for files, 1-based)
+    student_id: str
+    kind: str
+    message: str
+
+
+@dataclass
+class ValidationReport:
+    checked: int = 0
+    issues: list[Issue] = field(default_factory=list)
+
+    def counts(self):
+        """
+        Number of issues of each kind.
+        """
+        return Counter(issue.kind for issue in self.issues)
+
+    def to_dict(self):
+        return {
+            "checked": self.checked,
+            "counts": dict(self.counts()),
+            "issues": [asdict(issue) for issue in self.issues],
+        }
+
+
+def check_rows(rows, id_re=STUDENT_ID_RE):
+    """
+    Check (position, student_id, name, email) rows one at a time
+    against the format rules (duplicates are left to find_duplicates).
+    IDs are checked against id_re, if it is not None.
+    Returns the issues found. A plain function so worker processes can
+    run it.
+    """
+    email_ok = EMAIL_RE.match
+    id_ok = id_re.fullmatch if id_re is not None else None
+    issues = []
+    for position, student_id, name, email in rows:
+        if not student_id or not name or not email:
+            issues.append(Issue(position, student_id, MISSING_FIELD, "All fields are required."))
+            continue
+        if id_ok is not None and id_ok(student_id) is None:
+            issues.append(Issue(position, student_id, INVALID_ID, "Invalid student ID format."))
+        if email_ok(email) is None:
+            issues.append(Issue(position, student_id, INVALID_EMAIL, "Invalid email format."))
+        cleaned = clean_name(name)
+        if name != cleaned:
+            issues.append(Issue(position, student_id, NAME_NOT_NORMALIZED,
+                                f"Name should be written '{cleaned}'."))
+    return issues
+
+
+def find_duplicates(rows, seen_ids, seen_emails):
+    """
+    Report rows whose ID or email (ignoring case) appeared earlier.
+    seen_ids and seen_emails map those seen so far to their first
+    position and are updated, so chunks can be checked one by one.
+    """
+    issues = []
+    for position, student_id, name, email in rows:
+        if student_id:
+            key = student_id.upper()
+            if key in seen_ids:
+                issues.append(Issue(position, student_id, DUPLICATE_ID,
+                                    f"Student ID '{student_id}' is already registered "
+                                    f"(row {seen_ids[key]})."))
+            else:
+                seen_ids[key] = position
+        if email:
+            key = email.lower()
+            if key in seen_emails:
+                issues.append(Issue(position, student_id, DUPLICATE_EMAIL,
+                                    f"Email '{email}' is already registered (row {seen_emails[key]})."))
+            else:
+                seen_emails[key] = position
+    return issues
+
+
+def validate(rows, workers=None):
+    """
+    Check (position, student_id, name, email) rows in one pass: every
+    row against the format rules, a chunk at a time (in worker
+    processes when workers > 1), and all rows against each other for
+    duplicate IDs and emails.
+    Returns a ValidationReport with the issues in row order.
+    """
+    report = ValidationReport()
+    seen_ids = {}
+    seen_emails = {}
+    rows = iter(rows)
+    pool = ProcessPoolExecutor(workers) if workers and workers > 1 else None
+    pending = deque()  # chunks being checked by workers, oldest first
+    try:
+        while True:
+            chunk = list(islice(rows, CHUNK_SIZE))
+            if not chunk:
+                break
+            report.checked += len(chunk)
+            if pool is None:
+                report.issues.extend(check_rows(chunk))
+            else:
+                pending.append(pool.submit(check_rows, chunk))
+                # Keep a few chunks in flight, not the whole roster
+                if len(pending) > 2 * workers:
+                    report.issues.extend(pending.popleft().result())
+            report.issues.extend(find_duplicates(chunk, seen_ids, seen_emails))
+        while pending:
+            report.issues.extend(pending.popleft().result())
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    report.issues.sort(key=lambda issue: (issue.position, issue.kind))
+    return report
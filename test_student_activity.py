@@ -0,0 +1,88 @@
+# ------------------------------------------------------------
+# Tests for the login activity log (student_activity.py)
+# ------------------------------------------------------------
+# Run with: python -m pytest test_student_activity.py
+#       or: python -m unittest test_student_activity
+# ------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from student_activity import EVENT, ROLLUP_FILE, ActivityLog, local_day, segment_name, student_key
+
+# Local noon of a fixed day, so every login below falls on that day
+NOON = time.mktime((2024, 3, 5, 12, 0, 0, 0, 0, -1))
+HOUR = 3600
+
+
+class ActivityLogTests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def open_log(self):
+        log = ActivityLog(self.directory)
+        self.addCleanup(log.close)
+        return log
+
+    def test_rollups_count_logins_and_distinct_students(self):
+        log = self.open_log()
+        for student_id, when in (("S1", NOON), ("S2", NOON + 60), ("S1", NOON + HOUR)):
+            log.record(student_id, when)
+        log.catch_up()
+        day = local_day(NOON)
+        self.assertEqual(log.logins(NOON, NOON + HOUR), [(day, 3, 2)])
+        hourly = log.logins(NOON, NOON + HOUR, by="hour")
+        self.assertEqual([count for _, count, _ in hourly], [2, 1])
+        self.assertEqual(log.last_login("S1"), int(NOON + HOUR))
+        self.assertIsNone(log.last_login("S3"))
+        self.assertEqual(log.active_count(NOON + 61), 1)
+        with self.assertRaises(ValueError):
+            log.logins(NOON, NOON, by="week")
+
+    def test_reopened_log_reads_only_new_events(self):
+        log = ActivityLog(self.directory)
+        log.record("S1", NOON)
+        log.close()
+        self.assertTrue(os.path.exists(os.path.join(self.directory, ROLLUP_FILE)))
+        # Rewrite the checkpointed event: a log that re-read it would see SX
+        with open(os.path.join(self.directory, segment_name(NOON)), "r+b") as f:
+            f.write(EVENT.pack(int(NOON), student_key("SX")))
+        log = self.open_log()
+        self.assertEqual(log.last_seen, {})  # nothing is read until a report needs it
+        log.record("S2", NOON + 60)
+        log.catch_up()
+        self.assertEqual(log.last_login("S1"), int(NOON))
+        self.assertIsNone(log.last_login("SX"))
+        self.assertEqual(log.logins(NOON, NOON), [(local_day(NOON), 2, 2)])
+
+    def test_logins_from_other_writers_are_folded_in(self):
+        log = self.open_log()
+        log.record("S1", NOON)
+        with open(os.path.join(self.directory, segment_name(NOON)), "ab") as f:
+            f.write(EVENT.pack(int(NOON) + 5, student_key("S9")))
+            f.write(EVENT.pack(int(NOON) + 6, student_key("S8"))[:7])  # still being written
+        log.catch_up()
+        self.assertEqual(log.last_login("S9"), int(NOON) + 5)
+        self.assertIsNone(log.last_login("S8"))
+        self.assertEqual(log.logins(NOON, NOON), [(local_day(NOON), 2, 2)])
+
+    def test_damaged_rollups_are_rebuilt_from_the_segments(self):
+        log = ActivityLog(self.directory)
+        log.record("S1", NOON)
+        log.record("S1", NOON + 60)
+        log.close()
+        with open(os.path.join(self.directory, ROLLUP_FILE), "w") as f:
+            f.write("{not json")
+        log = self.open_log()
+        log.catch_up()
+        self.assertEqual(log.logins(NOON, NOON), [(local_day(NOON), 2, 1)])
+        self.assertEqual(log.last_login("S1"), int(NOON) + 60)
+
+
+if __name__ == "__main__":
+    unittest.main()
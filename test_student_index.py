@@ -0,0 +1,125 @@
+# ------------------------------------------------------------
+# Tests for the search and lookup indexes (student_index.py)
+# ------------------------------------------------------------
+# Run with: python -m pytest test_student_index.py
+#       or: python -m unittest test_student_index
+# ------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from student_index import LookupIndex, SearchIndex, rank_matches
+
+
+def record(name, email):
+    return {"name": name, "email": email}
+
+
+class SearchIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SearchIndex.build([("S1", record("Ada Lovelace", "")),
+                                        ("S2", record("Lovelace Ada", "")),
+                                        ("ADA", record("Grace Hopper", "")),
+                                        ("S4", record("Cicada Jones", "")),
+                                        ("T5", record("Nobody", ""))])
+
+    def test_results_are_ranked_exact_prefix_word_substring(self):
+        self.assertEqual(self.index.search("ada"), (["ADA", "S1", "S2", "S4"], 4))
+        self.assertEqual(self.index.search("ADA", prefix=True), (["ADA", "S1"], 2))
+        self.assertEqual(self.index.search("xyz"), ([], 0))
+        self.assertEqual(self.index.search(""), ([], 0))
+
+    def test_short_queries_and_paging(self):
+        self.assertEqual(self.index.search("s4"), (["S4"], 1))
+        self.assertEqual(self.index.search("ada", limit=2, offset=1), (["S1", "S2"], 4))
+
+    def test_add_and_remove_keep_the_index_current(self):
+        self.index.add("S1", "Grace Kelly")
+        self.index.remove("ADA")
+        self.index.remove("ADA")  # no-op
+        self.assertEqual(self.index.search("grace"), (["S1"], 1))
+        self.assertEqual(self.index.search("ada"), (["S2", "S4"], 2))
+        self.assertEqual(len(self.index), 4)
+
+    def test_rank_matches_agrees_with_the_index(self):
+        pairs = [("S1", "Ada Lovelace"), ("S2", "Lovelace Ada"), ("ADA", "Grace Hopper"),
+                 ("S4", "Cicada Jones"), ("T5", "Nobody")]
+        for query in ("ada", "love", "s", "t5", "hopper", "xyz"):
+            self.assertEqual(rank_matches(query, pairs), self.index.search(query))
+        self.assertEqual(rank_matches("ada", pairs, limit=1, offset=1), (["S1"], 4))
+        self.assertEqual(rank_matches("", pairs), ([], 0))
+
+
+class LookupIndexTests(unittest.TestCase):
+
+    def setUp(self):
+        self.index = LookupIndex.build([("S1", record("Ada Lovelace", "Ada@Example.com")),
+                                        ("S2", record("Alan  Turing", "alan@example.com")),
+                                        ("S3", record("ada lovelace", "countess@example.com"))])
+
+    def test_email_and_name_lookups_ignore_case_and_spacing(self):
+        self.assertEqual(self.index.by_email(" ADA@example.com "), "S1")
+        self.assertIsNone(self.index.by_email("nobody@example.com"))
+        self.assertEqual(self.index.by_name("ADA   LOVELACE"), ["S1", "S3"])
+        self.assertEqual(self.index.by_name("alan turing"), ["S2"])
+
+    def test_add_replaces_and_remove_forgets(self):
+        self.index.add("S2", record("Alan Turing", "turing@example.com"))
+        self.assertIsNone(self.index.by_email("alan@example.com"))
+        self.assertEqual(self.index.by_email("turing@example.com"), "S2")
+        self.index.remove("S1")
+        self.assertIsNone(self.index.by_email("ada@example.com"))
+        self.assertEqual(self.index.by_name("Ada Lovelace"), ["S3"])
+        self.index.remove("S1")  # no-op
+        self.assertEqual(len(self.index), 2)
+
+    def test_shared_email_passes_to_the_remaining_student(self):
+        self.index.add("S4", record("Ada Byron", "ada@example.com"))
+        self.assertEqual(self.index.by_email("ada@example.com"), "S1")
+        self.index.remove("S1")
+        self.assertEqual(self.index.by_email("ada@example.com"), "S4")
+
+    def test_saved_index_only_loads_for_its_signature(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "students.json.keys")
+        self.index.save(path, [(1, 2)])
+        loaded = LookupIndex.load(path, [(1, 2)])
+        self.assertEqual(loaded.by_name("ada lovelace"), ["S1", "S3"])
+        self.assertEqual(loaded.by_email("alan@example.com"), "S2")
+        self.assertIsNone(LookupIndex.load(path, [(1, 3)]))
+        self.assertIsNone(LookupIndex.load(path + ".missing", [(1, 2)]))
+        loaded.close()
+
+    def test_loaded_index_takes_changes_and_saves_them(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "students.json.keys")
+        self.index.add("S4", record("Ada Byron", "ada@example.com"))
+        self.index.save(path, [1])
+        loaded = LookupIndex.load(path, [1])
+        self.addCleanup(loaded.close)
+        self.assertEqual(len(loaded), 4)
+        self.assertEqual(loaded.by_email("ada@example.com"), "S1")
+        loaded.add("S5", record("Alan Turing", "ada@example.com"))
+        loaded.add("S3", record("Ada Byron", "byron@example.com"))
+        loaded.remove("S1")
+        self.assertEqual(loaded.by_email("ada@example.com"), "S4")
+        self.assertIsNone(loaded.by_email("countess@example.com"))
+        self.assertEqual(loaded.by_name("ada byron"), ["S3", "S4"])
+        self.assertEqual(loaded.by_name("alan turing"), ["S2", "S5"])
+        self.assertEqual(len(loaded), 4)
+        loaded.save(path, [2])
+        again = LookupIndex.load(path, [2])
+        self.addCleanup(again.close)
+        self.assertEqual(again.by_email("ada@example.com"), "S4")
+        self.assertEqual(again.by_email("byron@example.com"), "S3")
+        self.assertEqual(again.by_name("ada lovelace"), [])
+        self.assertEqual(len(again), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
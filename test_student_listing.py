@@ -0,0 +1,78 @@
+# ------------------------------------------------------------
+# Tests for sorted listings (student_listing.py)
+# ------------------------------------------------------------
+# Run with: python -m pytest test_student_listing.py
+#       or: python -m unittest test_student_listing
+# ------------------------------------------------------------
+
+import unittest
+
+from student_listing import Ordering, decode_cursor, encode_cursor, parse_fields
+
+
+def record(name, logins=0):
+    return {"name": name, "registered_on": "2024-01-01 00:00:00", "login_count": logins}
+
+
+class OrderingTests(unittest.TestCase):
+
+    def setUp(self):
+        self.ordering = Ordering.build("name", [("S3", record("carol")),
+                                                ("S1", record("Bob")),
+                                                ("S2", record("alice")),
+                                                ("S4", record("Bob"))])
+
+    def test_sorted_by_key_then_id(self):
+        self.assertEqual(self.ordering.page(), (["S2", "S1", "S4", "S3"], None))
+        self.assertEqual(self.ordering.page(reverse=True), (["S3", "S4", "S1", "S2"], None))
+
+    def test_pages_by_offset_and_cursor(self):
+        ids, cursor = self.ordering.page(limit=2)
+        self.assertEqual((ids, cursor), (["S2", "S1"], ["bob", "S1"]))
+        self.assertEqual(self.ordering.page(limit=2, after=cursor), (["S4", "S3"], None))
+        self.assertEqual(self.ordering.page(limit=2, offset=1, after=cursor), (["S3"], None))
+        ids, cursor = self.ordering.page(limit=3, reverse=True)
+        self.assertEqual(ids, ["S3", "S4", "S1"])
+        self.assertEqual(self.ordering.page(after=cursor, reverse=True), (["S2"], None))
+        self.assertEqual(self.ordering.page(offset=10), ([], None))
+
+    def test_add_moves_and_remove_drops(self):
+        self.ordering.add("S2", record("Dave"))
+        self.ordering.add("S5", record("Aaron"))
+        self.ordering.remove("S1")
+        self.ordering.remove("S1")  # no-op
+        self.assertEqual(self.ordering.page(), (["S5", "S4", "S3", "S2"], None))
+        self.assertEqual(len(self.ordering), 4)
+
+    def test_cursor_survives_changes_before_it(self):
+        _, cursor = self.ordering.page(limit=2)
+        self.ordering.remove("S2")
+        self.ordering.add("S0", record("Bob"))
+        self.assertEqual(self.ordering.page(after=cursor), (["S4", "S3"], None))
+
+    def test_logins_order_and_unknown_sort(self):
+        ordering = Ordering.build("logins", [("S1", record("a", 3)), ("S2", record("b", 1))])
+        ordering.add("S2", record("b", 5))
+        self.assertEqual(ordering.page(reverse=True), (["S2", "S1"], None))
+        with self.assertRaises(ValueError):
+            Ordering("age")
+
+
+class ListingHelperTests(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        self.assertEqual(decode_cursor(encode_cursor(["bob", "S1"])), ["bob", "S1"])
+        for text in ('["bob"]', '{"a": 1}', '[1, 2]'):
+            with self.assertRaises(ValueError):
+                decode_cursor(text)
+
+    def test_parse_fields(self):
+        self.assertEqual(parse_fields(" name, email ,"), ("name", "email"))
+        with self.assertRaises(ValueError):
+            parse_fields("name,password_hash")
+        with self.assertRaises(ValueError):
+            parse_fields(" , ")
+
+
+if __name__ == "__main__":
+    unittest.main()
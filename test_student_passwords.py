@@ -0,0 +1,87 @@
+# ------------------------------------------------------------
+# Tests for password hashing (student_passwords.py)
+# ------------------------------------------------------------
+# Run with: python -m pytest test_student_passwords.py
+#       or: python -m unittest test_student_passwords
+# ------------------------------------------------------------
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import student_passwords
+from student_passwords import hash_many, hash_password, needs_rehash, verify_password, verify_many
+from student_system import StudentSystem, new_record
+
+# Cheap costs, so the tests do not spend their time hashing
+FAST = {"SCRYPT_N": 16, "PBKDF2_ITERATIONS": 10}
+
+
+@unittest.skipUnless(student_passwords.HAVE_SCRYPT, "hashlib.scrypt is not available")
+class PasswordHashTests(unittest.TestCase):
+
+    def setUp(self):
+        for name, value in FAST.items():
+            patcher = mock.patch.object(student_passwords, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(student_passwords, "PASSWORD_KDF", "scrypt")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_hashes_are_salted_and_carry_their_cost(self):
+        first, second = hash_password("secret123"), hash_password("secret123")
+        self.assertNotEqual(first, second)
+        self.assertTrue(first.startswith("scrypt$16$8$1$"))
+        self.assertTrue(hash_password("secret123", "pbkdf2").startswith("pbkdf2_sha256$10$"))
+        with self.assertRaises(ValueError):
+            hash_password("secret123", "md5")
+
+    def test_verify_every_format(self):
+        for password_hash in (hash_password("secret123"),
+                              hash_password("secret123", "pbkdf2"),
+                              hashlib.sha256(b"secret123").hexdigest()):
+            self.assertTrue(verify_password("secret123", password_hash)[0])
+            self.assertEqual(verify_password("wrong", password_hash), (False, False))
+
+    def test_only_correct_passwords_with_old_settings_need_a_rehash(self):
+        current = hash_password("secret123")
+        self.assertEqual(verify_password("secret123", current), (True, False))
+        for stale in (hash_password("secret123", cost=32),
+                      hash_password("secret123", "pbkdf2"),
+                      hashlib.sha256(b"secret123").hexdigest().upper()):
+            self.assertTrue(needs_rehash(stale))
+            self.assertEqual(verify_password("secret123", stale), (True, True))
+            self.assertEqual(verify_password("wrong", stale), (False, False))
+        with mock.patch.object(student_passwords, "PASSWORD_KDF", "pbkdf2"):
+            self.assertTrue(needs_rehash(current))
+            self.assertFalse(needs_rehash(hash_password("secret123")))
+
+    def test_damaged_hashes_match_nothing(self):
+        for damaged in ("", "scrypt$x$8$1$AA==$AA==", "pbkdf2_sha256$10$!!$AA==", "scrypt$16$8$1$AA=="):
+            self.assertEqual(verify_password("secret123", damaged), (False, False))
+
+    def test_batches_keep_their_order(self):
+        hashes = hash_many(["one", "two", "three"], workers=1)
+        self.assertEqual(verify_many([("one", hashes[0]), ("two", hashes[2]), ("three", hashes[2])],
+                                     workers=1),
+                         [(True, False), (False, False), (True, False)])
+
+    def test_login_upgrades_a_legacy_hash(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        system = StudentSystem(os.path.join(directory, "students.json"))
+        self.addCleanup(system.close)
+        system.add_record("S1", new_record("Ada Lovelace", "ada@example.com",
+                                           hashlib.sha256(b"secret123").hexdigest()))
+        system.authenticate("S1", "secret123")
+        upgraded = system.get_record("S1")["password_hash"]
+        self.assertTrue(upgraded.startswith("scrypt$16$"))
+        self.assertEqual(verify_password("secret123", upgraded), (True, False))
+
+
+if __name__ == "__main__":
+    unittest.main()
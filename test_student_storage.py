@@ -0,0 +1,154 @@
+# ------------------------------------------------------------
+# Tests for the storage engines (student_storage.py)
+# ------------------------------------------------------------
+# Run with: python -m pytest test_student_storage.py
+#       or: python -m unittest test_student_storage
+# ------------------------------------------------------------
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from student_storage import (JournalStore, JsonStore, LazyStore, ShardedStore, StoreConflictError,
+                             StoreFormatError, merge_record, read_snapshot, write_snapshot)
+
+
+def record(name, login_count=0, last_login=None):
+    return {
+        "name": name,
+        "email": f"{name.lower().replace(' ', '.')}@example.com",
+        "password_hash": "0" * 64,
+        "registered_on": "2024-01-01 09:00:00",
+        "login_count": login_count,
+        "last_login": last_login,
+    }
+
+
+class StoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "students.json")
+        write_snapshot(self.path, {"S1": record("Ada Lovelace", 1, "2024-01-02 10:00:00")})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+
+class JournalTests(StoreTestCase):
+    store_class = JournalStore
+
+    def open(self):
+        return self.store_class(self.path, compact_after=1000).load()
+
+    def test_replay_survives_refresh_and_reopen(self):
+        with self.open() as store:
+            store["S2"] = record("Alan Turing")
+            store.patch("S1", {"login_count": 2})
+        with self.open() as store:
+            # Both changes are only in the journal
+            self.assertIn("S2", store)
+            store.refresh()
+            self.assertIn("S2", store)
+            self.assertEqual(store["S1"]["login_count"], 2)
+        with self.open() as store:
+            self.assertEqual(sorted(store), ["S1", "S2"])
+            store.save()
+        self.assertEqual(sorted(read_snapshot(self.path)), ["S1", "S2"])
+
+    def test_torn_journal_tail_is_cut_off(self):
+        with self.open() as store:
+            store["S2"] = record("Alan Turing")
+        with open(self.path + ".journal", "a") as f:
+            f.write('{"op":"put","id":"S3","rec')
+        with self.open() as store:
+            self.assertNotIn("S3", store)
+            store["S4"] = record("Grace Hopper")
+        with self.open() as store:
+            self.assertEqual(sorted(store), ["S1", "S2", "S4"])
+
+
+class LazyTests(JournalTests):
+    store_class = LazyStore
+
+
+class MergeTests(StoreTestCase):
+
+    def open(self):
+        return JsonStore(self.path).load()
+
+    def test_logins_from_both_sides_are_added(self):
+        first, second = self.open(), self.open()
+        first.patch("S1", {"login_count": 2, "last_login": "2024-01-03 10:00:00"})
+        second.patch("S1", {"login_count": 2, "last_login": "2024-01-03 10:00:00"})
+        self.assertEqual(read_snapshot(self.path)["S1"]["login_count"], 3)
+        self.assertEqual(second["S1"]["login_count"], 3)
+
+    def test_registrations_and_deletes_merge(self):
+        first, second = self.open(), self.open()
+        first["S2"] = record("Alan Turing")
+        second["S3"] = record("Grace Hopper")
+        del second["S1"]
+        self.assertEqual(sorted(read_snapshot(self.path)), ["S2", "S3"])
+        first.refresh()
+        self.assertEqual(sorted(first), ["S2", "S3"])
+
+    def test_conflicting_edits_keep_theirs(self):
+        first, second = self.open(), self.open()
+        first.patch("S1", {"name": "Ada King"})
+        with self.assertRaises(StoreConflictError):
+            second.patch("S1", {"name": "Ada Byron"})
+        self.assertEqual(read_snapshot(self.path)["S1"]["name"], "Ada King")
+
+    def test_merge_record_adds_equal_login_counts(self):
+        base = record("Ada", 1)
+        merged, ok = merge_record(base, record("Ada", 2), record("Ada", 2))
+        self.assertTrue(ok)
+        self.assertEqual(merged["login_count"], 3)
+
+
+class ShardedTests(StoreTestCase):
+
+    def open(self):
+        return ShardedStore(self.path, shards=4, workers=1).load()
+
+    def test_split_and_change_one_shard(self):
+        with self.open() as store:
+            store["S2"] = record("Alan Turing")
+            shard = store._shard("S2")
+            self.assertEqual(read_snapshot(shard.path)["S2"]["name"], "Alan Turing")
+        with self.open() as store:
+            self.assertEqual(sorted(store), ["S1", "S2"])
+
+    def test_damaged_shard_is_named(self):
+        with self.open() as store:
+            path = store._shard("S1").path
+        with open(path, "w") as f:
+            f.write("{")
+        with self.assertRaises(StoreFormatError) as caught:
+            self.open()
+        self.assertEqual(caught.exception.path, path)
+
+
+class BinarySnapshotTests(StoreTestCase):
+
+    def test_round_trip_and_damage(self):
+        records = {"S1": record("Zoë Ångström", 3, "2024-02-29 23:59:59"),
+                   "S2": dict(record("Bob"), password_hash="scrypt$16384$8$1$c2FsdA$a2V5",
+                              registered_on="yesterday")}
+        write_snapshot(self.path, records, snapshot_format="binary")
+        self.assertEqual(read_snapshot(self.path), records)
+        self.assertEqual({sid: dict(rec) for sid, rec in read_snapshot(self.path, True).items()},
+                         records)
+        with open(self.path, "r+b") as f:
+            f.seek(-5, os.SEEK_END)
+            byte = f.read(1)
+            f.seek(-5, os.SEEK_END)
+            f.write(bytes([byte[0] ^ 1]))
+        with self.assertRaises(StoreFormatError):
+            read_snapshot(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
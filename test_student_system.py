@@ -0,0 +1,70 @@
+# ------------------------------------------------------------
+# Tests for StudentSystem (student_system.py)
+# ------------------------------------------------------------
+# Run with: python -m pytest test_student_system.py
+#       or: python -m unittest test_student_system
+# ------------------------------------------------------------
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import student_system
+from student_system import StudentError, StudentSystem
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Registers one student from a separate process: data file, name, ID, email
+REGISTER = """
+import sys
+from student_system import StudentSystem
+with StudentSystem(sys.argv[1]) as system:
+    system.register_student(sys.argv[2], sys.argv[3], sys.argv[4], "password123")
+"""
+
+
+class SqliteSharingTests(unittest.TestCase):
+    """
+    Two processes on one students.db: changes the other process commits
+    must reach this one's in-memory indexes after a refresh.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "students.json")
+        patcher = mock.patch.object(student_system, "STORAGE_ENGINE", "sqlite")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.system = StudentSystem(self.path)
+        self.addCleanup(self.system.close)
+        self.system.register_student("Ada Lovelace", "S1", "one@example.com", "password123")
+
+    def register_elsewhere(self, name, student_id, email):
+        subprocess.run([sys.executable, "-c", REGISTER, self.path, name, student_id, email],
+                       cwd=HERE, env=dict(os.environ, STUDENT_STORAGE="sqlite"), check=True,
+                       stdout=subprocess.DEVNULL)
+
+    def test_email_taken_by_another_process_is_rejected(self):
+        self.assertIsNone(self.system.find_by_email("two@example.com"))  # builds the lookups
+        self.register_elsewhere("Alan Turing", "S2", "two@example.com")
+        self.system.refresh()
+        self.assertEqual(self.system.find_by_email("two@example.com").student_id, "S2")
+        with self.assertRaises(StudentError):
+            self.system.register_student("Grace Hopper", "S3", "two@example.com", "password123")
+
+    def test_search_sees_students_another_process_added(self):
+        self.assertEqual(self.system.find_students("ada").total, 1)
+        self.register_elsewhere("Ada Byron", "S2", "two@example.com")
+        page = self.system.find_students("ada")
+        # Both are prefix matches, so "Ada Byron" comes first by name
+        self.assertEqual([student.student_id for student in page.students], ["S2", "S1"])
+        self.assertEqual(page.total, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
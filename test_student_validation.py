@@ -0,0 +1,68 @@
+# ------------------------------------------------------------
+# Tests for batch validation (student_validation.py)
+# ------------------------------------------------------------
+# Run with: python -m pytest test_student_validation.py
+#       or: python -m unittest test_student_validation
+# ------------------------------------------------------------
+
+import unittest
+from unittest import mock
+
+import student_validation
+from student_validation import (DUPLICATE_EMAIL, DUPLICATE_ID, INVALID_EMAIL, INVALID_ID, MISSING_FIELD,
+                                NAME_NOT_NORMALIZED, check_rows, clean_name, find_duplicates, validate)
+
+ROWS = [
+    (1, "S1", "Ada Lovelace", "ada@example.com"),
+    (2, "S2", "alan  turing", "alan@example"),
+    (3, "s1", "Grace Hopper", "ADA@example.com"),
+    (4, "", "No Id", "noid@example.com"),
+    (5, "21/U/1234", "Katherine Johnson", "kj@example.com"),
+]
+
+
+def kinds(issues):
+    return [(issue.position, issue.kind) for issue in issues]
+
+
+class ValidationTests(unittest.TestCase):
+
+    def test_check_rows_applies_the_format_rules(self):
+        self.assertEqual(kinds(check_rows(ROWS)),
+                         [(2, INVALID_EMAIL), (2, NAME_NOT_NORMALIZED), (3, INVALID_ID),
+                          (4, MISSING_FIELD), (5, INVALID_ID)])
+        # Without an ID pattern, only the other rules apply
+        self.assertEqual(kinds(check_rows(ROWS, id_re=None)),
+                         [(2, INVALID_EMAIL), (2, NAME_NOT_NORMALIZED), (4, MISSING_FIELD)])
+
+    def test_find_duplicates_ignores_case_and_carries_over(self):
+        seen_ids, seen_emails = {}, {}
+        issues = find_duplicates(ROWS[:3], seen_ids, seen_emails)
+        self.assertEqual(kinds(issues), [(3, DUPLICATE_ID), (3, DUPLICATE_EMAIL)])
+        self.assertIn("(row 1)", issues[0].message)
+        issues = find_duplicates([(6, "S2", "Someone", "kj@example.com")], seen_ids, seen_emails)
+        self.assertEqual(kinds(issues), [(6, DUPLICATE_ID)])
+
+    def test_validate_reports_every_issue_in_row_order(self):
+        report = validate(ROWS)
+        self.assertEqual(report.checked, 5)
+        self.assertEqual(kinds(report.issues),
+                         [(2, INVALID_EMAIL), (2, NAME_NOT_NORMALIZED), (3, DUPLICATE_EMAIL),
+                          (3, DUPLICATE_ID), (3, INVALID_ID), (4, MISSING_FIELD), (5, INVALID_ID)])
+        self.assertEqual(report.counts()[INVALID_ID], 2)
+        self.assertEqual(report.to_dict()["counts"][DUPLICATE_ID], 1)
+
+    def test_chunks_and_workers_give_the_same_report(self):
+        rows = [(position, f"S{position % 7}", name, email)
+                for position, (_, _, name, email) in enumerate(ROWS * 4, 1)]
+        expected = validate(rows).issues
+        with mock.patch.object(student_validation, "CHUNK_SIZE", 3):
+            self.assertEqual(validate(rows).issues, expected)
+            self.assertEqual(validate(rows, workers=2).issues, expected)
+
+    def test_clean_name(self):
+        self.assertEqual(clean_name("  ada   LOVELACE "), "Ada Lovelace")
+
+
+if __name__ == "__main__":
+    unittest.main()